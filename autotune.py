@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+""" This module tunes the render settings of every scene under a quality budget (autotune)
+    A few frames of every segment of the TIMELINE are rendered small with the best settings
+     there are (the reference), then the settings are lowered one after the other: the trace
+     level, the bailout, the quality, the anti-aliasing threshold and depth
+    Every setting gets the cheapest value whose images still look like the reference,
+     measured with the structural similarity (SSIM) of the worst frame of the segment,
+     a setting without such a value keeps its default (the config or POV-Ray's own)
+    The tuned settings of every segment are written to the settings profile ('SceneProfile'),
+     the final render picks it up from there by itself (see 'render_pipeline.segment_settings')
+
+    Usage:
+        python3 autotune.py [--budget 0.98] [--scale 0.25] [--frames 2] [profile.json]"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import json
+import time
+import argparse
+import importlib
+import numpy as np
+from PIL import Image
+from pypovray import logger, SETTINGS
+import render_pipeline as pipeline
+from benchmark import benchmark_dir, representative_frames, build_job
+from preview import scaled_settings
+from shard import ANIMATION
+
+
+# ------------------[CONSTANTS]------------------
+# The settings the reference images are rendered with, better than any value that is tried
+REFERENCE = {'Quality': 11, 'AntiAlias': 0.005, 'AntialiasDepth': 4,
+             'MaxTraceLevel': 10, 'AdcBailout': 0.001}
+# The values that are tried for every setting, cheapest first, in the order they are tuned
+SEARCH = [('MaxTraceLevel', [1, 2, 3, 5, 8]),
+          ('AdcBailout', [0.1, 0.03, 0.01, 0.0039]),
+          ('Quality', [4, 6, 8, 9]),
+          ('AntiAlias', [0, 0.3, 0.1, 0.03, 0.01]),
+          ('AntialiasDepth', [1, 2, 3])]
+# POV-Ray's own values for the settings that are not in the config
+POVRAY_DEFAULTS = {'MaxTraceLevel': 5, 'AdcBailout': 0.0039, 'AntialiasDepth': 3}
+SSIM_WINDOW = 7
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+
+# ------------------[Functions]------------------
+def box_mean(image, size):
+    """ Returns the mean of every 'size' by 'size' window of an image (only whole windows) """
+    summed = np.pad(image, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    windows = summed[size:, size:] - summed[:-size, size:] - summed[size:, :-size] + \
+        summed[:-size, :-size]
+    return windows / size ** 2
+
+
+def ssim(first, second, size=SSIM_WINDOW):
+    """ Returns the mean structural similarity of the luminance of two images (1 is identical) """
+    first = np.asarray(Image.open(first).convert('L'), dtype=float)
+    second = np.asarray(Image.open(second).convert('L'), dtype=float)
+    if first.shape != second.shape:
+        return 0.0
+    mean_1, mean_2 = box_mean(first, size), box_mean(second, size)
+    variance_1 = box_mean(first * first, size) - mean_1 ** 2
+    variance_2 = box_mean(second * second, size) - mean_2 ** 2
+    covariance = box_mean(first * second, size) - mean_1 * mean_2
+    similarity = ((2 * mean_1 * mean_2 + SSIM_C1) * (2 * covariance + SSIM_C2)) / \
+        ((mean_1 ** 2 + mean_2 ** 2 + SSIM_C1) * (variance_1 + variance_2 + SSIM_C2))
+    return float(similarity.mean())
+
+
+def tune_file(name, step):
+    """ Returns the location of an image rendered while tuning """
+    return benchmark_dir('tune', '{}_{:04d}.png'.format(name, step))
+
+
+def render_trial(animation, steps, settings, header, name):
+    """ Renders the frames with the settings to 'tune_file(name, step)'
+        It returns the seconds POV-Ray ran for all frames together """
+    seconds = 0.0
+    for step in steps:
+        job, _, _ = build_job(animation.frame, step, settings, header, tune_file(name, step))
+        seconds += pipeline.render_sdl(job)['povray_seconds']
+    return seconds
+
+
+def score(animation, steps, settings, header):
+    """ Renders the frames with the settings and compares them to the reference images
+        It returns the SSIM of the worst frame and the seconds POV-Ray ran """
+    seconds = render_trial(animation, steps, settings, header, 'trial')
+    worst = min(ssim(tune_file('trial', step), tune_file('reference', step)) for step in steps)
+    for step in steps:
+        os.remove(tune_file('trial', step))
+    return worst, seconds
+
+
+def tune_segment(animation, steps, base, header, budget, defaults=None):
+    """ This function finds the cheapest settings for the frames of one segment.
+            - steps: the frames of the segment that are rendered
+            - base: the (scaled) render settings the tuned settings are added to
+            - budget: the lowest SSIM a frame may have compared to the reference
+            - defaults: the value a setting gets when none of its values meets the budget,
+               without it the most expensive value that is tried
+        It returns a dictionary with the tuned 'settings', their 'ssim' and the
+         render 'seconds' of the frames with the tuned and the reference settings """
+    defaults = defaults or dict()
+    reference_seconds = render_trial(animation, steps, dict(base, **REFERENCE),
+                                     header, 'reference')
+    tuned, similarity, seconds = dict(REFERENCE), 1.0, reference_seconds
+    for name, values in SEARCH:
+        if name == 'AntialiasDepth' and not tuned['AntiAlias']:
+            # Without anti-aliasing the depth does not matter
+            tuned[name] = values[0]
+            continue
+        for value in values:
+            trial = dict(tuned, **{name: value})
+            trial_ssim, trial_seconds = score(animation, steps, dict(base, **trial), header)
+            if trial_ssim >= budget:
+                tuned, similarity, seconds = trial, trial_ssim, trial_seconds
+                break
+        else:
+            # The reference value is more expensive than any value that is tried
+            tuned = dict(tuned, **{name: defaults.get(name, values[-1])})
+            similarity, seconds = score(animation, steps, dict(base, **tuned), header)
+    for step in steps:
+        os.remove(tune_file('reference', step))
+    return {'settings': tuned, 'ssim': similarity, 'seconds': seconds,
+            'reference_seconds': reference_seconds}
+
+
+def autotune(animation, includes, budget, scale, count):
+    """ Tunes the settings of every segment of the animation, the frames are rendered at
+         'scale' times the final size, 'count' frames per segment
+        It returns the settings profile as a dictionary that can be written as JSON """
+    header, _ = pipeline.include_header(includes)
+    base = scaled_settings(scale, REFERENCE['Quality'], 0)
+    os.makedirs(benchmark_dir('tune'), exist_ok=True)
+    frames = representative_frames(animation.TIMELINE, count)
+    defaults = dict(POVRAY_DEFAULTS, **pipeline.render_settings())
+
+    segments = dict()
+    for segment in range(len(animation.TIMELINE)):
+        steps = [step for frame_segment, step in frames if frame_segment == segment]
+        result = tune_segment(animation, steps, base, header, budget, defaults)
+        result['scene'] = animation.SCENE_NAMES[segment]
+        segments[str(segment)] = result
+        logger.info(" %s: %s, SSIM %.4f, %.2fs instead of %.2fs", result['scene'],
+                    ' '.join('{}={}'.format(name, value)
+                             for name, value in sorted(result['settings'].items())),
+                    result['ssim'], result['seconds'], result['reference_seconds'])
+    return {'time': time.time(), 'module': animation.__name__, 'budget': budget,
+            'scale': scale, 'settings': pipeline.render_settings(), 'segments': segments}
+
+
+def main():
+    """ Reads the command line, tunes the settings and writes the profile """
+    parser = argparse.ArgumentParser(description='Tune the render settings of every scene')
+    parser.add_argument('profile', nargs='?', help='the profile to write, by default SceneProfile')
+    parser.add_argument('--budget', type=float, default=getattr(SETTINGS, 'TuneBudget', 0.98),
+                        help='the lowest SSIM compared to the reference')
+    parser.add_argument('--scale', type=float, default=getattr(SETTINGS, 'TuneScale', 0.25),
+                        help='part of the final image size the frames are tuned at')
+    parser.add_argument('--frames', type=int, default=2, help='frames tuned per segment')
+    parser.add_argument('--module', default=ANIMATION, help='module with the animation')
+    args = parser.parse_args()
+
+    animation = importlib.import_module(args.module)
+    includes = animation.prepare_render()
+    profile = autotune(animation, includes, args.budget, args.scale, args.frames)
+    path = args.profile or pipeline.profile_file()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as output:
+        json.dump(profile, output, indent=1)
+    logger.info(" Settings profile written to %s", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+""" This module measures how long every scene of the animation takes to build and to render
+    A few representative frames (the start, middle and end) of every segment of the TIMELINE
+     are built and rendered at several sizes and qualities, the building of the scene, the
+     conversion to SDL and the POV-Ray render are timed separately
+    The results are written as JSON, so the runs can be compared after a change
+    Golden frames are small renders that are known to be correct, 'check' renders the same
+     frames again and tells which ones differ more than the tolerance
+
+    Usage:
+        python3 benchmark.py run [results.json]  -> times all levels and writes the results
+        python3 benchmark.py golden               -> renders and stores the golden frames
+        python3 benchmark.py check                -> compares new renders to the golden frames"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import numpy as np
+from PIL import Image
+from pypovray import logger, SETTINGS
+import render_pipeline as pipeline
+from overlay import place_captions
+from preview import scaled_settings
+from shard import ANIMATION
+
+
+# ------------------[CONSTANTS]------------------
+# The levels that get timed: part of the final image size and the quality
+LEVELS = [(0.1, 4), (0.25, 9), (0.5, 9)]
+GOLDEN_LEVEL = (0.1, 9)  # The size and quality of the golden frames
+FRAMES_PER_SCENE = 3
+MEAN_TOLERANCE = 1.0  # Maximum mean difference of a pixel channel (0-255)
+PIXEL_TOLERANCE = 24  # A pixel channel that differs more than this counts as different
+PIXEL_FRACTION = 0.002  # Maximum part of the pixel channels that may be different
+
+
+# ------------------[Functions]------------------
+def benchmark_dir(*parts):
+    """ Returns a location in the benchmark directory ('BenchmarkDir') """
+    directory = getattr(SETTINGS, 'BenchmarkDir', None) or os.path.join(SETTINGS.AppLocation,
+                                                                         'benchmark')
+    return os.path.join(directory, *parts)
+
+
+def representative_frames(timeline, count=FRAMES_PER_SCENE):
+    """ Returns a list of (segment, step) tuples with 'count' frames spread over every segment """
+    frames = list()
+    for segment in range(len(timeline)):
+        steps = timeline.frames(segment)
+        picks = sorted({steps[(len(steps) - 1) * pick // max(count - 1, 1)]
+                        for pick in range(count)})
+        frames += [(segment, step) for step in picks]
+    return frames
+
+
+def build_job(frame, step, settings, header, out_file):
+    """ Builds the scene of a frame and its SDL, the same way 'group_frames' does
+        It returns the render job and the seconds building the scene and the SDL took """
+    start = time.perf_counter()
+    scene = frame(step)
+    built = time.perf_counter()
+    captions = place_captions(getattr(scene, 'captions', []), scene.camera,
+                              settings['ImageWidth'], settings['ImageHeight'],
+                              pipeline.font_library())
+    sdl = header + pipeline.scene_sdl(scene, settings)
+    converted = time.perf_counter()
+    job = {'sdl': sdl, 'step': step, 'out_file': out_file,
+           'settings': settings, 'captions': captions}
+    return job, built - start, converted - built
+
+
+def measure(animation, includes, levels=LEVELS):
+    """ Builds and renders the representative frames at every level, one at a time
+        It returns the results as a dictionary that can be written as JSON """
+    header, _ = pipeline.include_header(includes)
+    os.makedirs(benchmark_dir('images'), exist_ok=True)
+    records = list()
+    for scale, quality in levels:
+        settings = scaled_settings(scale, quality, SETTINGS.AntiAlias)
+        for segment, step in representative_frames(animation.TIMELINE):
+            out_file = benchmark_dir('images', 'bench_{:04d}.png'.format(step))
+            job, build_seconds, sdl_seconds = build_job(animation.frame, step, settings,
+                                                        header, out_file)
+            start = time.perf_counter()
+            pipeline.render_sdl(job)
+            render_seconds = time.perf_counter() - start
+            os.remove(out_file)
+            records.append({'segment': segment, 'scene': animation.SCENE_NAMES[segment],
+                            'step': step, 'width': settings['ImageWidth'],
+                            'height': settings['ImageHeight'], 'quality': settings['Quality'],
+                            'sdl_bytes': len(job['sdl']), 'build_seconds': build_seconds,
+                            'sdl_seconds': sdl_seconds, 'render_seconds': render_seconds})
+            logger.info(" %s frame %d at %dx%d Q%d: build %.3fs, render %.3fs",
+                        records[-1]['scene'], step, settings['ImageWidth'],
+                        settings['ImageHeight'], settings['Quality'], build_seconds, render_seconds)
+    return {'time': time.time(), 'module': animation.__name__,
+            'settings': pipeline.render_settings(), 'records': records}
+
+
+def golden_file(step):
+    """ Returns the location of the golden image of a frame """
+    return benchmark_dir('golden', 'golden_{:04d}.png'.format(step))
+
+
+def check_file(step):
+    """ Returns the location of a frame that is rendered to compare with its golden image """
+    return benchmark_dir('images', 'check_{:04d}.png'.format(step))
+
+
+def render_golden(animation, includes, file_name):
+    """ Renders the representative frames at the golden level to 'file_name(step)'
+        It returns the steps and the settings that were used """
+    settings = scaled_settings(GOLDEN_LEVEL[0], GOLDEN_LEVEL[1], SETTINGS.AntiAlias)
+    header, _ = pipeline.include_header(includes)
+    steps = [step for _, step in representative_frames(animation.TIMELINE)]
+    for step in steps:
+        job, _, _ = build_job(animation.frame, step, settings, header, file_name(step))
+        pipeline.render_sdl(job)
+    return steps, settings
+
+
+def save_golden(animation, includes):
+    """ Renders the golden frames and stores them with their settings """
+    os.makedirs(benchmark_dir('golden'), exist_ok=True)
+    steps, settings = render_golden(animation, includes, golden_file)
+    with open(benchmark_dir('golden', 'golden.json'), 'w') as golden:
+        json.dump({'steps': steps, 'settings': settings}, golden)
+    logger.info(" Stored %d golden frames", len(steps))
+    return steps
+
+
+def compare(image_file, golden_file_name):
+    """ Returns the mean difference of the pixel channels of two images and the part
+         of the channels that differ more than PIXEL_TOLERANCE """
+    image = np.asarray(Image.open(image_file).convert('RGB'), dtype=np.int16)
+    golden = np.asarray(Image.open(golden_file_name).convert('RGB'), dtype=np.int16)
+    if image.shape != golden.shape:
+        return float('inf'), 1.0
+    difference = np.abs(image - golden)
+    return float(difference.mean()), float((difference > PIXEL_TOLERANCE).mean())
+
+
+def check_golden(animation, includes):
+    """ Renders the golden frames again and compares them to the stored ones
+        It returns a list of (step, mean difference, different part) of the frames that failed """
+    with open(benchmark_dir('golden', 'golden.json')) as golden:
+        stored = json.load(golden)
+    os.makedirs(benchmark_dir('images'), exist_ok=True)
+    steps, settings = render_golden(animation, includes, check_file)
+    if steps != stored['steps'] or settings != stored['settings']:
+        logger.warning(" The golden frames were rendered with other frames or settings")
+
+    failed = list()
+    for step in steps:
+        mean, different = compare(check_file(step), golden_file(step))
+        os.remove(check_file(step))
+        if mean > MEAN_TOLERANCE or different > PIXEL_FRACTION:
+            failed.append((step, mean, different))
+            logger.warning(" Frame %d differs from its golden frame: mean %.3f, %.2f%% of pixels",
+                           step, mean, 100 * different)
+    logger.info(" %d of %d frames match their golden frame", len(steps) - len(failed), len(steps))
+    return failed
+
+
+def main():
+    """ Reads the command line and runs the benchmark, stores or checks the golden frames """
+    parser = argparse.ArgumentParser(description='Benchmark the scenes of the animation')
+    parser.add_argument('command', choices=['run', 'golden', 'check'])
+    parser.add_argument('results', nargs='?', help='JSON file for the results of "run"')
+    parser.add_argument('--module', default=ANIMATION, help='module with the animation')
+    args = parser.parse_args()
+
+    animation = importlib.import_module(args.module)
+    includes = animation.prepare_render()
+    if args.command == 'run':
+        results = measure(animation, includes)
+        path = args.results or benchmark_dir('results_{}.json'.format(
+            time.strftime('%Y%m%d_%H%M%S', time.localtime(results['time']))))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as output:
+            json.dump(results, output, indent=1)
+        logger.info(" Results written to %s", path)
+    elif args.command == 'golden':
+        save_golden(animation, includes)
+    else:
+        sys.exit(1 if check_golden(animation, includes) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+""" This module keeps a checkpoint of the frames that are already rendered
+    For every finished frame the hash of its SDL, the hash of the render settings and
+     a checksum of the image are written to a JSON manifest next to the images
+    When a render is started again only the frames that are missing, have a different
+     checksum (corrupt) or a different SDL or settings (stale) are rendered again
+    Every host writes its own manifest ('<name>.<host>.json') and reads those of all hosts,
+     so hosts that share the images over a network drive do not overwrite each other
+    The manifest is written after every SAVE_EVERY frames or SAVE_SECONDS instead of after
+     every frame, a render that stops renders at most those last frames again"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import glob
+import json
+import time
+import socket
+import hashlib
+
+
+# ------------------[CONSTANTS]------------------
+SAVE_EVERY = 32  # Recorded images after which the manifest is written again
+SAVE_SECONDS = 30  # Seconds after which the manifest is written again
+
+
+# ------------------[Functions]------------------
+def file_checksum(path):
+    """ Returns the SHA-1 checksum of a file """
+    checksum = hashlib.sha1()
+    with open(path, 'rb') as image:
+        for block in iter(lambda: image.read(1 << 20), b''):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def settings_hash(settings):
+    """ Returns a hash of the render settings """
+    used = ';'.join('{}={}'.format(name, settings[name]) for name in sorted(settings))
+    return hashlib.sha1(used.encode('utf-8')).hexdigest()
+
+
+def read_manifest(path):
+    """ Returns the frames of a manifest, a manifest that can not be read counts as empty """
+    try:
+        with open(path) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return dict()
+
+
+class Checkpoint:
+    """ The manifests of the frames that are finished
+            - path: the JSON file of the manifest, the manifest of this host is written next to it
+            - host: the name of this host, by default its hostname """
+    def __init__(self, path, host=None):
+        self.path = path
+        self.host = host or socket.gethostname()
+        root, extension = os.path.splitext(path)
+        self.own_path = '{}.{}{}'.format(root, self.host, extension)
+        self.frames, self.own = dict(), dict()
+        # The newest manifest wins when two hosts rendered the same frame
+        for manifest_path in sorted(self.manifests(), key=os.path.getmtime):
+            frames = read_manifest(manifest_path)
+            self.frames.update(frames)
+            if manifest_path == self.own_path:
+                self.own = frames
+        self.pending, self.saved = 0, time.time()
+
+    def manifests(self):
+        """ Returns the manifests of all hosts (and the one of a single host render) """
+        root, extension = os.path.splitext(self.path)
+        pattern = '{}{}'.format(glob.escape(root), extension)
+        return glob.glob(pattern) + glob.glob('{}.*{}'.format(glob.escape(root), extension))
+
+    def is_current(self, step, sdl_key, settings, image_file):
+        """ Returns True when the frame was rendered with this SDL and these settings
+             and its image is still there """
+        entry = self.frames.get(str(step))
+        return (entry is not None and os.path.exists(image_file) and
+                entry['sdl'] == sdl_key and entry['settings'] == settings_hash(settings))
+
+    def is_finished(self, step, sdl_key, settings, image_file):
+        """ Returns True when the frame is current and its image still has the same checksum """
+        return (self.is_current(step, sdl_key, settings, image_file) and
+                self.frames[str(step)]['checksum'] == file_checksum(image_file))
+
+    def is_damaged(self, step, sdl_key, settings, image_file):
+        """ Returns True when the frame is current but its image was changed afterwards """
+        return (self.is_current(step, sdl_key, settings, image_file) and
+                self.frames[str(step)]['checksum'] != file_checksum(image_file))
+
+    def record(self, steps, sdl_key, settings, image_file):
+        """ Adds finished frames that share the same image to the manifest """
+        entry = {'sdl': sdl_key, 'settings': settings_hash(settings),
+                 'checksum': file_checksum(image_file)}
+        for step in steps:
+            self.frames[str(step)] = self.own[str(step)] = dict(entry, step=step)
+        self.pending += 1
+
+    def save(self, force=False):
+        """ Writes the manifest of this host after SAVE_EVERY images or SAVE_SECONDS (right away
+             with 'force'), under a temporary name first so a crash never leaves half a file """
+        if not self.pending or (not force and self.pending < SAVE_EVERY and
+                                time.time() - self.saved < SAVE_SECONDS):
+            return
+        temp_path = '{}.{}.tmp'.format(self.own_path, os.getpid())
+        with open(temp_path, 'w') as manifest:
+            json.dump(self.own, manifest)
+        os.replace(temp_path, self.own_path)
+        self.pending, self.saved = 0, time.time()
+
+    def remove(self):
+        """ Removes the manifests of all hosts, for when the images are removed too """
+        for manifest_path in self.manifests():
+            os.remove(manifest_path)
+        self.frames, self.own, self.pending = dict(), dict(), 0
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+""" This module finds the part of the image that changes between two scenes (the dirty rectangle)
+    When the camera, the lights and everything else around the objects stay the same, only the
+     objects that were added, removed or changed can make pixels change, their bounding boxes
+     are projected through the camera and together they give the region that has to be rendered
+    The rest of the image can be taken from the image of the previous scene
+    Anything that can not be bounded falls back to a full render: another camera or segment, an
+     object without a known shape, a light that casts shadows or something behind the camera
+    Reflections and refractions (ior) can show a changed object somewhere else, so the bounding
+     boxes of those objects are added to the region too unless 'DirtyReflections' is turned off"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import re
+import math
+from collections import Counter
+import numpy as np
+from vapory import Sphere, SphereSweep, Box, Cylinder, Cone, LightSource, Object
+from projection import project
+from scheduler import REFLECTIVE
+
+
+# ------------------[CONSTANTS]------------------
+REFRACTIVE = re.compile(r'\bior\s+([0-9.]+)')
+FULL_AREA = 0.6  # When more of the image than this changes a full render is cheaper
+SPLINE_SLACK = 0.25  # A cubic spline can bulge out this part of a segment past its points
+
+
+# ------------------[Functions]------------------
+def expanded_sdl(obj, declared):
+    """ Returns the SDL of an object followed by the SDL of the declared models it refers to """
+    sdl = str(obj)
+    for name, body in declared.items():
+        if re.search(r'\b{}\b'.format(re.escape(name)), sdl):
+            sdl += body
+    return sdl
+
+
+def rotation(angles):
+    """ Returns the matrix of a POV-Ray 'rotate' (around x, then y, then z, in degrees)
+         for row vectors, the way POV-Ray applies it """
+    matrix = np.identity(3)
+    for axis, angle in enumerate(np.radians(angles)):
+        cos, sin = math.cos(angle), math.sin(angle)
+        first, second = [index for index in range(3) if index != axis]
+        turn = np.identity(3)
+        turn[first, first], turn[second, second] = cos, cos
+        if axis == 1:
+            turn[first, second], turn[second, first] = -sin, sin
+        else:
+            turn[first, second], turn[second, first] = sin, -sin
+        matrix = matrix @ turn
+    return matrix
+
+
+def transformed_corners(low, high, args):
+    """ Returns the 8 corners of a box after the 'scale', 'rotate' and 'translate' in 'args'
+        A scale of 0 is changed to 1, like POV-Ray does """
+    corners = np.array([[x, y, z] for x in (low[0], high[0])
+                        for y in (low[1], high[1]) for z in (low[2], high[2])], dtype=float)
+    for index, arg in enumerate(args[:-1]):
+        if not isinstance(arg, str):
+            continue
+        value = args[index + 1]
+        if arg == 'scale':
+            factors = np.broadcast_to(np.asarray(value, dtype=float), (3,)).copy()
+            factors[factors == 0] = 1
+            corners = corners * factors
+        elif arg == 'translate':
+            corners = corners + np.asarray(value, dtype=float)
+        elif arg == 'rotate':
+            corners = corners @ rotation(value)
+    return corners
+
+
+def object_corners(obj):
+    """ Returns the corners of the bounding box of an object,
+         or None for objects whose shape is not known here """
+    args = obj.args
+    if isinstance(obj, Sphere):
+        center, radius = np.asarray(args[0], dtype=float), float(args[1])
+        low, high, rest = center - radius, center + radius, args[2:]
+    elif isinstance(obj, SphereSweep):
+        count = int(args[1])
+        points = np.array(args[2:2 + 2 * count:2], dtype=float)
+        radius = max(float(value) for value in args[3:3 + 2 * count:2])
+        steps = np.linalg.norm(np.diff(points, axis=0), axis=1) if count > 1 else [0]
+        slack = radius + (SPLINE_SLACK * max(steps) if args[0] != 'linear_spline' else 0)
+        low, high = points.min(axis=0) - slack, points.max(axis=0) + slack
+        rest = args[2 + 2 * count:]
+    elif isinstance(obj, Box):
+        first, second = np.asarray(args[0], dtype=float), np.asarray(args[1], dtype=float)
+        low, high, rest = np.minimum(first, second), np.maximum(first, second), args[2:]
+    elif isinstance(obj, (Cylinder, Cone)):
+        if isinstance(obj, Cylinder):
+            ends, radius, rest = args[0:2], float(args[2]), args[3:]
+        else:
+            ends, radius, rest = [args[0], args[2]], max(float(args[1]), float(args[3])), args[4:]
+        ends = np.array(ends, dtype=float)
+        low, high = ends.min(axis=0) - radius, ends.max(axis=0) + radius
+    else:
+        return None
+    return transformed_corners(low, high, rest)
+
+
+def screen_box(corners, camera, width, height, margin):
+    """ Projects a bounding box onto the image, it returns the (top, bottom, left, right)
+         pixels around it with 'margin' extra pixels, clipped to the image,
+         None when the box is (partly) behind the camera and False when it is outside the image """
+    pixels, depth = project(corners, camera, width, height)
+    if (depth <= 1e-6).any():
+        return None
+    left, top = np.floor(pixels.min(axis=0)).astype(int) - margin
+    right, bottom = np.ceil(pixels.max(axis=0)).astype(int) + margin
+    if right <= 0 or bottom <= 0 or left >= width or top >= height:
+        return False
+    return max(top, 0), min(bottom, height), max(left, 0), min(right, width)
+
+
+def backdrop(scene):
+    """ Returns everything of a scene except its objects, as far as it changes the image """
+    return (str(scene.camera), str(scene.atmospheric), str(scene.global_settings),
+            str(scene.included), str(scene.defaults), str(scene.declares),
+            getattr(scene, 'segment', None))
+
+
+def casts_shadows(obj, declared):
+    """ Returns True for a light (also one that is declared) that is not shadowless """
+    if not isinstance(obj, (LightSource, Object)):
+        return False
+    sdl = expanded_sdl(obj, declared)
+    return 'light_source' in sdl and 'shadowless' not in sdl
+
+
+def mirrors(obj, declared):
+    """ Returns True when other objects can be seen in an object, by reflection or refraction """
+    sdl = expanded_sdl(obj, declared)
+    return any(float(value) > 0 for value in REFLECTIVE.findall(sdl)) or \
+        any(float(value) != 1 for value in REFRACTIVE.findall(sdl))
+
+
+def dirty_rectangle(previous, current, width, height, declared=None, margin=8, reflections=True):
+    """ This function finds the part of the image that changes from scene 'previous' to 'current'.
+            - width, height: the size of the image in pixels
+            - declared: the SDL of the declared models the scenes refer to by name
+            - margin: extra pixels around every changed object
+            - reflections: also render the objects the changes can be seen in
+        It returns the (top, bottom, left, right) of the region, a region without any
+         rows when nothing changes, or None when the whole frame has to be rendered """
+    declared = declared or dict()
+    if previous is None or backdrop(previous) != backdrop(current):
+        return None
+    before, after = Counter(map(str, previous.objects)), Counter(map(str, current.objects))
+    changed = [obj for obj in previous.objects if before[str(obj)] > after[str(obj)]] + \
+              [obj for obj in current.objects if after[str(obj)] > before[str(obj)]]
+    if not changed:
+        return 0, 0, 0, 0
+    if any(casts_shadows(obj, declared) for obj in current.objects):
+        return None
+
+    regions = list()
+    affected = changed
+    if reflections:
+        affected = changed + [obj for obj in current.objects
+                              if obj not in changed and mirrors(obj, declared)]
+    for obj in affected:
+        corners = object_corners(obj)
+        region = None if corners is None else screen_box(corners, current.camera,
+                                                         width, height, margin)
+        if region is None:
+            return None
+        if region:
+            regions.append(region)
+    if not regions:
+        return 0, 0, 0, 0
+
+    top, bottom = min(region[0] for region in regions), max(region[1] for region in regions)
+    left, right = min(region[2] for region in regions), max(region[3] for region in regions)
+    # POV-Ray needs at least two rows and columns to tell a pixel number from a percentage
+    bottom, right = min(max(bottom, top + 2), height), min(max(right, left + 2), width)
+    top, left = min(top, bottom - 2), min(left, right - 2)
+    if (bottom - top) * (right - left) > FULL_AREA * width * height:
+        return None
+    return int(top), int(bottom), int(left), int(right)
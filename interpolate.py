@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+""" This module makes the in-between frames of the movie when it plays at a higher frame rate
+     than the frames are rendered at ('MovieFPS' and 'RenderFPS')
+    Every movie frame lies at a point in time between two rendered frames and is made by
+     blending those two frames, weighted by how close it is to each of them
+    Frames are never blended across a scene cut or a gap in the selected frames, a movie frame
+     before a cut or a gap shows the last rendered frame before it"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import math
+from bisect import bisect_right
+import numpy as np
+from PIL import Image
+
+
+# ------------------[Functions]------------------
+def crosses_cut(first, second, cuts):
+    """ Returns True when a scene starts after frame 'first' up to and including frame 'second'
+            - cuts: the sorted frame numbers where a new scene starts """
+    return bisect_right(cuts, second) > bisect_right(cuts, first)
+
+
+def can_blend(first, second, cuts):
+    """ Returns True when two rendered frames follow each other directly in the same scene """
+    return second == first + 1 and not crosses_cut(first, second, cuts)
+
+
+def movie_positions(count, render_fps, movie_fps):
+    """ Yields for every movie frame the index of the rendered frame before it
+         and how far (0 up to 1) it is on the way to the next rendered frame """
+    for index in range(math.ceil(count * movie_fps / render_fps)):
+        position = index * render_fps / movie_fps
+        before = min(int(position), count - 1)
+        yield before, position - before
+
+
+def read_frame(image_file):
+    """ Reads a rendered frame as an array of floats """
+    return np.asarray(Image.open(image_file).convert('RGB'), dtype=np.float32)
+
+
+def interpolated_frames(frame_ids, file_name, cuts, render_fps, movie_fps):
+    """ Yields the images of the movie frames as arrays, only two rendered frames are read at a time
+            - frame_ids: the rendered frames in the order of the movie, frames that do not
+               follow each other (a selection with gaps) are not blended
+            - file_name: the function that gives the image name of a frame
+            - cuts: the frame numbers where a new scene starts """
+    cuts = sorted(cuts)
+    loaded = dict()
+    for before, weight in movie_positions(len(frame_ids), render_fps, movie_fps):
+        after = before + 1
+        blend = (weight > 0 and after < len(frame_ids) and
+                 can_blend(frame_ids[before], frame_ids[after], cuts))
+        needed = (before, after) if blend else (before,)
+        loaded = {index: loaded[index] if index in loaded else read_frame(file_name(frame_ids[index]))
+                  for index in needed}
+        if blend:
+            pixels = (1 - weight) * loaded[before] + weight * loaded[after]
+        else:
+            pixels = loaded[before]
+        yield np.round(pixels).astype(np.uint8)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+""" This module lowers the detail of objects that are small on the image (level of detail)
+    The size of an object on the image is found by projecting its bounding box through the camera
+    A sphere sweep is drawn as it is when it is thick enough on the image, when it gets thinner
+     its tolerance is raised, then the cubic spline is replaced by a linear spline through points
+     on the curve and at last by a chain of cylinders and spheres
+    Objects that cover only a few pixels lose the reflection in their finish, nobody can see
+     what they reflect but POV-Ray would still trace it"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import math
+import numpy as np
+from vapory import Sphere, SphereSweep, Cylinder, Union, Texture, Finish
+from projection import project, pixel_size
+from incremental import object_corners
+
+
+# ------------------[CONSTANTS]------------------
+FULL_DETAIL = 12  # A sweep at least this many pixels thick is not changed
+LINEAR_DETAIL = 5  # Thinner than this the cubic spline becomes a linear spline
+CHAIN_DETAIL = 2  # Thinner than this the sweep becomes a chain of cylinders and spheres
+MAX_TOLERANCE = 1.0
+SAMPLE_PIXELS = 8  # Length on the image of a straight piece of a simplified curve
+FINISH_PIXELS = 24  # Objects smaller than this on the image lose their reflection
+
+
+# ------------------[Functions]------------------
+def screen_size(obj, camera, width, height):
+    """ Returns the size in pixels of the largest side of an object on the image and how far
+         its nearest corner is in front of the camera, or None for an unknown shape or an
+         object that reaches behind the camera """
+    corners = object_corners(obj)
+    if corners is None:
+        return None
+    pixels, depth = project(corners, camera, width, height)
+    if (depth <= 1e-6).any():
+        return None
+    return (pixels.max(axis=0) - pixels.min(axis=0)).max(), depth.min()
+
+
+def catmull_rom(points, radii, samples):
+    """ Returns points and radii on the cubic spline of a sweep, the way POV-Ray makes it:
+         a Catmull-Rom spline where the first and last point only steer the curve
+            - samples: the number of straight pieces between two points on the curve """
+    curve, sizes = [points[1]], [radii[1]]
+    for index in range(1, len(points) - 2):
+        p0, p1, p2, p3 = points[index - 1:index + 3]
+        r0, r1, r2, r3 = radii[index - 1:index + 3]
+        for t in np.linspace(0, 1, samples[index - 1] + 1)[1:]:
+            weights = 0.5 * np.array([-t ** 3 + 2 * t ** 2 - t, 3 * t ** 3 - 5 * t ** 2 + 2,
+                                      -3 * t ** 3 + 4 * t ** 2 + t, t ** 3 - t ** 2])
+            curve.append(weights @ np.array([p0, p1, p2, p3]))
+            sizes.append(weights @ np.array([r0, r1, r2, r3]))
+    return np.array(curve), np.array(sizes)
+
+
+def sweep_parts(sweep):
+    """ Splits the arguments of a sphere sweep into its points, radii and everything after them """
+    count = int(sweep.args[1])
+    points = np.array(sweep.args[2:2 + 2 * count:2], dtype=float)
+    radii = np.array(sweep.args[3:3 + 2 * count:2], dtype=float)
+    return points, radii, list(sweep.args[2 + 2 * count:])
+
+
+def with_tolerance(rest, tolerance):
+    """ Returns the modifiers of a sweep with the tolerance changed (or added) """
+    if 'tolerance' in rest:
+        index = rest.index('tolerance')
+        return rest[:index] + ['tolerance', tolerance] + rest[index + 2:]
+    return ['tolerance', tolerance] + rest
+
+
+def simple_sweep(sweep, camera, width, height):
+    """ Returns a sphere sweep with as much detail as its thickness on the image needs """
+    if sweep.args[0] != 'cubic_spline' or screen_size(sweep, camera, width, height) is None:
+        return sweep
+    points, radii, rest = sweep_parts(sweep)
+    pixels, depth = project(points, camera, width, height)
+    thickness = pixel_size(2 * radii.max(), depth.min(), height)
+    if thickness >= FULL_DETAIL:
+        return sweep
+
+    rest_tolerance = rest[rest.index('tolerance') + 1] if 'tolerance' in rest else 1e-6
+    if thickness >= LINEAR_DETAIL:
+        tolerance = min(MAX_TOLERANCE, rest_tolerance * FULL_DETAIL / max(thickness, 1e-9))
+        return SphereSweep(sweep.args[0], len(points),
+                           *[value for point, radius in zip(points.tolist(), radii.tolist())
+                             for value in (point, radius)], *with_tolerance(rest, tolerance))
+
+    # The pieces of the curve get about SAMPLE_PIXELS long on the image
+    lengths = np.linalg.norm(np.diff(pixels[1:-1], axis=0), axis=1)
+    samples = [max(1, math.ceil(length / SAMPLE_PIXELS)) for length in lengths]
+    curve, sizes = catmull_rom(points, radii, samples)
+    if thickness >= CHAIN_DETAIL:
+        return SphereSweep('linear_spline', len(curve),
+                           *[value for point, radius in zip(curve.tolist(), sizes.tolist())
+                             for value in (point, radius)], *rest)
+
+    # A union has no tolerance, the texture and transformations of the sweep are kept
+    modifiers = list(rest)
+    if 'tolerance' in modifiers:
+        index = modifiers.index('tolerance')
+        del modifiers[index:index + 2]
+    parts = [Sphere(point, radius) for point, radius in zip(curve.tolist(), sizes.tolist())]
+    parts += [Cylinder(start, end, min(first, second))
+              for start, end, first, second in zip(curve[:-1].tolist(), curve[1:].tolist(),
+                                                   sizes[:-1].tolist(), sizes[1:].tolist())
+              if start != end]
+    return Union(*parts, *modifiers)
+
+
+def without_reflection(texture):
+    """ Returns the texture without reflection in its finish, a reference to a declared
+         texture (see 'shared_models') is replaced by the texture itself """
+    original = getattr(texture, 'declared', texture)
+    finishes = [arg for arg in original.args if isinstance(arg, Finish)]
+    if not any('reflection' in finish.args for finish in finishes):
+        return texture
+    args = list()
+    for arg in original.args:
+        if isinstance(arg, Finish):
+            index = arg.args.index('reflection') if 'reflection' in arg.args else None
+            arg = Finish(*arg.args) if index is None else \
+                Finish(*(arg.args[:index] + arg.args[index + 2:]))
+        args.append(arg)
+    return Texture(*args)
+
+
+def simple_finish(obj, camera, width, height):
+    """ Returns the object without reflections when it covers only a few pixels """
+    size = screen_size(obj, camera, width, height)
+    if size is None or size[0] >= FINISH_PIXELS:
+        return obj
+    args = [without_reflection(arg) if isinstance(arg, Texture) else arg for arg in obj.args]
+    return obj.__class__(*args)
+
+
+def level_of_detail(scene, width, height):
+    """ This function lowers the detail of the objects of a scene that are small on the image.
+            - scene: the vapory scene, its objects are replaced
+            - width, height: the size of the image in pixels
+        It returns the same scene """
+    objects = list()
+    for obj in scene.objects:
+        if isinstance(obj, SphereSweep):
+            obj = simple_sweep(obj, scene.camera, width, height)
+        if isinstance(obj, (Sphere, SphereSweep)):
+            obj = simple_finish(obj, scene.camera, width, height)
+        objects.append(obj)
+    scene.objects = objects
+    return scene
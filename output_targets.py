@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+""" This module encodes one stream of rendered frames into several movies at once
+    Every output target has its own size, frame rate, codec and container, for instance a
+     720p movie for the web next to a small preview GIF, the frames are only rendered once
+    A frame is decoded once, scaled once with NumPy for every size that is asked for (area
+     averaging) and sent as raw pixels to an ffmpeg process per target
+    The decoding, the scaling per size and the ffmpeg processes all run next to each other,
+     the queues between them are small so a slow encoder holds back the frames, not the memory
+
+    The targets are given as text, separated by commas, with per target the suffix of the movie
+     name, the size, the frame rate, the codec and the container, for instance:
+        _720p 1280x720 30 libx264 mp4, _preview 320x180 10 gif gif"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import io
+import os
+import queue
+import threading
+import subprocess
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+from stream_encoder import FFMPEG_BINARY
+
+
+# ------------------[CONSTANTS]------------------
+QUEUE_SIZE = 4  # Frames that may wait in front of every step
+PALETTE_CODECS = ['gif']  # Codecs that pick their own pixel format instead of yuv420p
+
+
+# ------------------[Functions]------------------
+def parse_targets(spec):
+    """ This function reads the output targets from their text form.
+            - spec: the targets separated by commas, every target as
+               'suffix WIDTHxHEIGHT fps codec container'
+        It returns a list with a dictionary per target """
+    targets = list()
+    for part in spec.split(','):
+        fields = part.split()
+        if not fields:
+            continue
+        if len(fields) != 5 or 'x' not in fields[1].lower():
+            raise ValueError("An output target needs a suffix, WIDTHxHEIGHT, frame rate, codec "
+                             "and container, not '{}'".format(part.strip()))
+        suffix, size, fps, codec, container = fields
+        width, height = (int(value) for value in size.lower().split('x'))
+        targets.append({'suffix': suffix, 'width': width, 'height': height,
+                        'fps': float(fps), 'codec': codec, 'container': container})
+    return targets
+
+
+@lru_cache(maxsize=None)
+def area_taps(size_in, size_out):
+    """ Returns, for every output pixel along one axis, the input pixels it covers and how much
+         of each (area averaging), as two arrays of shape (size_out, taps) """
+    scale = size_in / size_out
+    taps = int(np.ceil(scale)) + 1
+    lows = np.arange(size_out)[:, np.newaxis] * scale
+    indices = np.floor(lows).astype(int) + np.arange(taps)
+    overlap = np.clip(np.minimum(lows + scale, indices + 1) - np.maximum(lows, indices), 0, None)
+    return np.minimum(indices, size_in - 1), overlap / overlap.sum(axis=1, keepdims=True)
+
+
+def downscale(pixels, width, height):
+    """ Returns the RGB pixels of an image scaled to 'width' by 'height',
+         every new pixel is the average of the pixels it covers """
+    if pixels.shape[:2] == (height, width):
+        return pixels
+    rows, row_weights = area_taps(pixels.shape[0], height)
+    columns, column_weights = area_taps(pixels.shape[1], width)
+    image = pixels.astype(np.float32)
+    image = sum(image[rows[:, tap]] * row_weights[:, tap, np.newaxis, np.newaxis]
+                for tap in range(rows.shape[1]))
+    image = sum(image[:, columns[:, tap]] * column_weights[np.newaxis, :, tap, np.newaxis]
+                for tap in range(columns.shape[1]))
+    return np.clip(image.round(), 0, 255).astype(np.uint8)
+
+
+def encoder_command(target, input_fps):
+    """ Returns the ffmpeg command that encodes raw RGB frames of a target into its movie """
+    command = [FFMPEG_BINARY, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+               '-s', '{}x{}'.format(target['width'], target['height']),
+               '-framerate', str(input_fps), '-i', '-',
+               '-r', str(target['fps']), '-c:v', target['codec']]
+    if target['codec'] not in PALETTE_CODECS:
+        command += ['-pix_fmt', 'yuv420p']
+    return command + [target['movie']]
+
+
+class TargetEncoders:
+    """ Encodes the same frames into the movies of several output targets
+            - targets: the targets from 'parse_targets', every target with the 'movie' to write
+            - input_fps: the frame rate the frames are written at """
+    def __init__(self, targets, input_fps):
+        self.targets = targets
+        self.errors = list()
+        self.processes = list()
+        for target in targets:
+            os.makedirs(os.path.dirname(os.path.abspath(target['movie'])), exist_ok=True)
+            self.processes.append(subprocess.Popen(encoder_command(target, input_fps),
+                                                   stdin=subprocess.PIPE, stderr=subprocess.PIPE))
+
+        # One scaling thread per size, targets with the same size share the scaled frames
+        sizes = dict()
+        for target, process in zip(targets, self.processes):
+            sizes.setdefault((target['width'], target['height']), list()).append(process)
+        self.frames = queue.Queue(QUEUE_SIZE)
+        self.scalers = [(size, processes, queue.Queue(QUEUE_SIZE))
+                        for size, processes in sizes.items()]
+        self.threads = [threading.Thread(target=self.decode, daemon=True)]
+        self.threads += [threading.Thread(target=self.scale, args=scaler, daemon=True)
+                         for scaler in self.scalers]
+        for thread in self.threads:
+            thread.start()
+
+    def write(self, image):
+        """ Adds a frame: the contents of a PNG file or an array of RGB pixels """
+        self.frames.put(image)
+
+    def decode(self):
+        """ Turns every frame into pixels once and hands them to the scaling threads """
+        while True:
+            image = self.frames.get()
+            if image is not None and not isinstance(image, np.ndarray) and not self.errors:
+                try:
+                    image = np.asarray(Image.open(io.BytesIO(image)).convert('RGB'))
+                except (IOError, ValueError) as error:
+                    self.errors.append(error)
+            for _, _, frames in self.scalers:
+                frames.put(image)
+            if image is None:
+                return
+
+    def scale(self, size, processes, frames):
+        """ Scales every frame to one size and sends it to the encoders of that size,
+             after an error the frames are still taken so the other threads are not held up """
+        while True:
+            pixels = frames.get()
+            if pixels is None:
+                return
+            if self.errors:
+                continue
+            try:
+                data = downscale(pixels, *size).tobytes()
+                for process in processes:
+                    process.stdin.write(data)
+            except (OSError, ValueError) as error:
+                self.errors.append(error)
+
+    def close(self):
+        """ Waits until every frame is encoded and the movies are written
+            It returns the locations of the movies """
+        self.frames.put(None)
+        for thread in self.threads:
+            thread.join()
+        failed = list()
+        for target, process in zip(self.targets, self.processes):
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            error = process.stderr.read()
+            if process.wait():
+                failed.append('{}: {}'.format(target['movie'], error.decode('ascii', 'replace')))
+        if failed or self.errors:
+            raise IOError("ffmpeg encoding of the output targets failed with the following "
+                          "error: " + '; '.join(failed + [str(error) for error in self.errors]))
+        return [target['movie'] for target in self.targets]
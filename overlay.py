@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+""" This module draws the caption texts onto the rendered images instead of ray tracing them
+    'lift_captions' takes the Text objects out of a scene and remembers them as captions,
+     after POV-Ray rendered the rest of the scene 'draw_captions' paints them onto the image
+    Every caption string is rasterized once with PIL and then blended in with NumPy,
+     the position and size come from projecting the 3D text through the camera
+    The font of a Text is looked up like POV-Ray does, in the 'Library_Path' directories of its
+     povray.ini, PIL does not know those directories so a font that is not found is an error"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from vapory import Text
+from projection import project, pixel_size
+
+
+# ------------------[CONSTANTS]------------------
+# A caption in the scene: the text, the location of the start of the baseline, the font height
+#  and the font file as the Text names it
+Caption = namedtuple('Caption', ['text', 'position', 'size', 'font'])
+
+# The povray.ini files POV-Ray reads its 'Library_Path' from, the first one that exists is used
+POVRAY_INI = [os.environ.get('POVINI', ''), '~/.povray/3.7/povray.ini',
+              '/usr/local/etc/povray/3.7/povray.ini', '/etc/povray/3.7/povray.ini']
+LIBRARY_PATH = re.compile(r'^\s*Library_Path\s*=\s*"?([^";\n]+?)"?\s*(;.*)?$', re.MULTILINE)
+CAPTION_COLOR = np.array([255, 255, 255], dtype=float)
+CAPTION_OPACITY = 0.8  # The text_model has a filter of 0.2
+
+
+# ------------------[Functions]------------------
+def text_caption(text):
+    """ Turns a vapory Text object into a Caption
+        The text starts at the origin with a height of 1 and is then moved by its
+         'translate' and 'scale' transformations in the order they are given,
+         a scale of 0 is changed to 1 like POV-Ray does """
+    args = text.args
+    string = args[2].strip('"')
+    position, size = np.zeros(3), 1.0
+    for index, arg in enumerate(args[:-1]):
+        if arg == 'translate':
+            position = position + np.array(args[index + 1], dtype=float)
+        elif arg == 'scale':
+            scale = np.broadcast_to(np.asarray(args[index + 1], dtype=float), (3,)).copy()
+            scale[scale == 0] = 1
+            position = position * scale
+            size = size * scale[1]
+    return Caption(string, tuple(position.tolist()), size, args[1].strip('"'))
+
+
+def lift_captions(scene):
+    """ Takes all Text objects out of a scene and puts them in 'scene.captions'
+        It returns the same scene so it can be used directly in 'frame' """
+    captions = [text_caption(obj) for obj in scene.objects if isinstance(obj, Text)]
+    scene.objects = [obj for obj in scene.objects if not isinstance(obj, Text)]
+    scene.captions = captions
+    return scene
+
+
+def library_paths():
+    """ Returns the 'Library_Path' directories of the first povray.ini that exists """
+    for path in POVRAY_INI:
+        path = os.path.expanduser(path)
+        if path and os.path.isfile(path):
+            with open(path) as ini:
+                return [match.group(1).strip() for match in LIBRARY_PATH.finditer(ini.read())]
+    return list()
+
+
+@lru_cache(maxsize=16)
+def find_font(font, library=()):
+    """ Returns the location of a font file, searched like POV-Ray does
+            - font: the font file as a Text names it, like 'timrom.ttf'
+            - library: directories that are searched before the 'Library_Path' of POV-Ray
+        It raises an IOError when the font can not be found, otherwise PIL would quietly
+         use its small default font """
+    if os.path.isfile(font):
+        return os.path.abspath(font)
+    directories = list(library) + library_paths()
+    for directory in directories:
+        path = os.path.join(os.path.expanduser(directory), font)
+        if os.path.isfile(path):
+            return path
+    raise IOError("Caption font '{}' was not found in {}, add its directory to 'LibraryPath' "
+                  "or turn off 'CaptionOverlay'".format(font, directories or 'the Library_Path'))
+
+
+def place_captions(captions, camera, width, height, library=()):
+    """ Projects the captions onto the image of the camera
+        The fonts are looked up with 'find_font' in 'library' and the 'Library_Path' of POV-Ray
+        It returns a list of (text, x, y, font size, font file) tuples in pixels, that is all
+         'draw_captions' needs and it can easily be sent to a pool worker """
+    if not captions:
+        return list()
+    pixels, depth = project([caption.position for caption in captions], camera, width, height)
+    placed = list()
+    for caption, (pixel_x, pixel_y), distance in zip(captions, pixels, depth):
+        if distance > 0:
+            size = int(round(pixel_size(caption.size, distance, height)))
+            placed.append((caption.text, int(round(pixel_x)), int(round(pixel_y)), size,
+                           find_font(caption.font, tuple(library))))
+    return placed
+
+
+@lru_cache(maxsize=64)
+def glyph_mask(text, size, font_file):
+    """ Rasterizes a caption once, it returns the coverage of every pixel (0 to 1)
+         and where the baseline starts inside the mask """
+    font = ImageFont.truetype(font_file, size)
+    left, top, right, bottom = font.getbbox(text, anchor='ls')
+    mask = Image.new('L', (max(right - left, 1), max(bottom - top, 1)))
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255, anchor='ls')
+    return np.asarray(mask, dtype=float) / 255, left, top
+
+
+def draw_captions(image_file, placed):
+    """ Paints the placed captions onto a rendered image and saves it again """
+    image = np.asarray(Image.open(image_file).convert('RGB'))
+    Image.fromarray(paint_captions(image, placed)).save(image_file)
+
+
+def paint_captions(pixels, placed):
+    """ Returns the RGB pixels of an image with the placed captions painted onto them """
+    image = np.asarray(pixels, dtype=float)
+    height, width = image.shape[:2]
+    for text, pixel_x, pixel_y, size, font_file in placed:
+        mask, left, top = glyph_mask(text, max(size, 1), font_file)
+        start_x, start_y = pixel_x + left, pixel_y + top
+
+        # Only the part of the caption that falls inside the image is drawn
+        x_0, y_0 = max(start_x, 0), max(start_y, 0)
+        x_1 = min(start_x + mask.shape[1], width)
+        y_1 = min(start_y + mask.shape[0], height)
+        if x_0 >= x_1 or y_0 >= y_1:
+            continue
+        alpha = CAPTION_OPACITY * mask[y_0 - start_y:y_1 - start_y,
+                                       x_0 - start_x:x_1 - start_x, np.newaxis]
+        region = image[y_0:y_1, x_0:x_1]
+        image[y_0:y_1, x_0:x_1] = region * (1 - alpha) + CAPTION_COLOR * alpha
+    return image.round().astype(np.uint8)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+""" This module renders a quick preview of the animation that is refined step by step
+    First the whole timeline is rendered small, with a low quality and only every 'PreviewStride'
+     frame, and this preview movie is encoded right away
+    In a background thread the frames are then rendered again at better settings, every
+     upgraded frame replaces the old one in the image sequence and the movie is encoded again
+     after every level, the last level uses the normal SETTINGS and gives the final movie"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import shutil
+import threading
+from functools import partial
+from PIL import Image
+from pypovray import logger, SETTINGS
+import render_pipeline as pipeline
+
+
+# ------------------[Functions]------------------
+def scaled_settings(scale, quality, antialias):
+    """ Returns the render settings with a smaller image, another quality and anti-aliasing
+        The image size stays even, the mp4 encoder needs that """
+    settings = pipeline.render_settings()
+    settings['ImageWidth'] = max(2, int(settings['ImageWidth'] * scale) // 2 * 2)
+    settings['ImageHeight'] = max(2, int(settings['ImageHeight'] * scale) // 2 * 2)
+    settings['Quality'] = min(quality, settings['Quality'])
+    settings['AntiAlias'] = antialias
+    return settings
+
+
+def preview_levels():
+    """ Returns a list with the render settings and the frame stride of every level
+            - level 0: 'PreviewScale' of the size, 'PreviewQuality' and every 'PreviewStride' frame
+            - level 1: twice that size and every frame, still without anti-aliasing
+            - level 2: the final settings """
+    scale = getattr(SETTINGS, 'PreviewScale', 0.25)
+    quality = getattr(SETTINGS, 'PreviewQuality', 4)
+    return [(scaled_settings(scale, quality, 0), getattr(SETTINGS, 'PreviewStride', 4)),
+            (scaled_settings(min(2 * scale, 1), quality, 0), 1),
+            (pipeline.render_settings(), 1)]
+
+
+def level_file(level, step):
+    """ Returns the location of the image of a frame rendered at a preview level """
+    file_name = '{}_{:04d}.png'.format(SETTINGS.OutputPrefix, step)
+    return os.path.join(SETTINGS.OutputImageDir, 'level{}'.format(level), file_name)
+
+
+def swap_in(level, steps):
+    """ Replaces the frames in the image sequence by their version of 'level', scaled up
+         to the final size so all frames of the movie have the same size
+        The old image is removed first because it can be a hardlink into the render cache """
+    size = (SETTINGS.ImageWidth, SETTINGS.ImageHeight)
+    for step in steps:
+        image = Image.open(level_file(level, step)).convert('RGB')
+        if image.size != size:
+            image = image.resize(size, Image.BILINEAR)
+        target = pipeline.frame_file(step)
+        if os.path.exists(target):
+            os.remove(target)
+        image.save(target)
+
+
+def render_level(frame, frame_ids, includes, level, settings, final):
+    """ Renders one level, every upgraded frame is swapped in as soon as it is ready
+        The final level renders straight into the image sequence """
+    if final:
+        pipeline.render_frames(frame, frame_ids, includes, settings,
+                               profile=pipeline.load_profile())
+    else:
+        pipeline.render_frames(frame, frame_ids, includes, settings, partial(level_file, level),
+                               ready=partial(swap_in, level))
+
+
+def refine(frame, frame_ids, includes, levels):
+    """ Renders the levels after the first one and encodes the movie again after every level """
+    for level, (settings, stride) in enumerate(levels[1:], start=1):
+        final = level == len(levels) - 1
+        render_level(frame, frame_ids[::stride], includes, level, settings, final)
+        movie = pipeline.encode_movie(frame_ids, None if final else pipeline.movie_file('_preview'))
+        logger.info(" Preview level %d finished: %s", level, movie)
+
+    for level in range(len(levels) - 1):
+        shutil.rmtree(os.path.dirname(level_file(level, 0)), ignore_errors=True)
+    if SETTINGS.RemoveTempFiles:
+        pipeline.remove_frames(frame_ids)
+
+
+def render_preview(frame, frame_ids=None, includes=()):
+    """ Renders the preview movie and starts refining it in the background
+            - frame: the function that creates the scene of a frame
+            - frame_ids: the frame numbers to render, by default all frames are rendered
+            - includes: include files that every frame needs, like the shared models
+        It returns the preview movie and the thread that refines it, the final movie is
+         in 'movie_file' once the thread is finished """
+    if frame_ids is None:
+        frame_ids = range(int(SETTINGS.NumberFrames))
+    frame_ids = list(frame_ids)
+    levels = preview_levels()
+
+    settings, stride = levels[0]
+    render_level(frame, frame_ids[::stride], includes, 0, settings, False)
+    pipeline.hold_frames(frame_ids, set(frame_ids[::stride]))
+    movie = pipeline.encode_movie(frame_ids, pipeline.movie_file('_preview'))
+    logger.info(" Preview movie ready: %s", movie)
+
+    thread = threading.Thread(target=refine, args=(frame, frame_ids, includes, levels),
+                              name='preview-refine')
+    thread.start()
+    return movie, thread
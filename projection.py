@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+""" This module projects locations in a scene onto the pixels of the rendered image
+    It follows the POV-Ray perspective camera that vapory creates: a 'location', a 'look_at',
+     an optional 'translate' and a 'right' vector that matches the aspect ratio of the image
+    The up vector has length 1 and the direction has length 1, so the image spans
+     one unit of height at one unit of distance in front of the camera"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import numpy as np
+
+
+# ------------------[Functions]------------------
+def camera_vectors(camera):
+    """ Reads the location and look_at out of a vapory Camera, including its translations,
+         a reference to a declared camera (see 'shared_models') is read from that camera
+        It returns the location and look_at as NumPy arrays """
+    location, look_at, moved = np.zeros(3), np.array([0.0, 0.0, 1.0]), np.zeros(3)
+    args = camera.args
+    if hasattr(camera, 'declared'):
+        args = camera.declared.args + args
+    for index, arg in enumerate(args[:-1]):
+        if arg == 'location':
+            location = np.array(args[index + 1], dtype=float)
+        elif arg == 'look_at':
+            look_at = np.array(args[index + 1], dtype=float)
+        elif arg == 'translate':
+            moved = moved + np.array(args[index + 1], dtype=float)
+    return location + moved, look_at + moved
+
+
+def camera_axes(location, look_at):
+    """ Returns the right, up and forward unit vectors of a camera in the POV-Ray
+         (left handed) coordinate system, the sky is always [0, 1, 0] """
+    forward = look_at - location
+    forward = forward / np.linalg.norm(forward)
+    right = np.cross([0.0, 1.0, 0.0], forward)
+    right = right / np.linalg.norm(right)
+    up = np.cross(forward, right)
+    return right, up, forward
+
+
+def project(points, camera, width, height):
+    """ This function projects locations onto the image of a camera.
+            - points: a list or array of [x, y, z] locations
+            - camera: the vapory Camera of the scene
+            - width, height: the size of the image in pixels
+        It returns an array with the [x, y] pixel of every point and an array with
+         the distance of every point in front of the camera (0 or less is behind it) """
+    location, look_at = camera_vectors(camera)
+    right, up, forward = camera_axes(location, look_at)
+    offset = np.atleast_2d(np.asarray(points, dtype=float)) - location
+
+    depth = offset @ forward
+    safe_depth = np.where(depth > 1e-9, depth, 1e-9)
+    aspect = width / height
+    pixel_x = (0.5 + (offset @ right) / safe_depth / aspect) * width
+    pixel_y = (0.5 - (offset @ up) / safe_depth) * height
+    return np.column_stack([pixel_x, pixel_y]), depth
+
+
+def pixel_size(size, depth, height):
+    """ Returns how many pixels high something of 'size' units is at 'depth' in front of the camera """
+    return size / np.maximum(depth, 1e-9) * height
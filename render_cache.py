@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+""" This module contains the render cache that keeps rendered images between runs
+    Images are stored under the hash of the frame SDL together with the render settings,
+     so a frame that did not change since a previous run does not have to be rendered again
+    The cache has a maximum size, when it gets too big the least recently used images are removed"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import shutil
+import hashlib
+
+
+# ------------------[CONSTANTS]------------------
+RENDER_KEYS = ['ImageWidth', 'ImageHeight', 'Quality', 'AntiAlias']
+
+
+# ------------------[Functions]------------------
+def cache_key(sdl_key, settings):
+    """ Combines the hash of the SDL with the render settings that change the image
+            - sdl_key: the hash of the SDL of the frame
+            - settings: a dictionary with at least the keys in RENDER_KEYS, other keys
+               (like the tuned ones of a settings profile) are added after them
+        It returns the key the image is stored under in the cache """
+    names = RENDER_KEYS + sorted(set(settings) - set(RENDER_KEYS))
+    used = ';'.join('{}={}'.format(name, settings[name]) for name in names)
+    return hashlib.sha1((sdl_key + ';' + used).encode('utf-8')).hexdigest()
+
+
+def place_file(source, target):
+    """ Puts 'source' at 'target' with a hardlink, or with a copy if linking is not possible """
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class RenderCache:
+    """ A content addressed store of rendered images on disk
+            - location: the directory the images are stored in
+            - max_size: the maximum size of the cache in MB """
+    def __init__(self, location, max_size):
+        self.location = location
+        self.max_size = max_size * 1024 * 1024
+        os.makedirs(location, exist_ok=True)
+
+    def path(self, key):
+        """ Returns where the image with this key is stored """
+        return os.path.join(self.location, key[:2], key + '.png')
+
+    def lookup(self, key):
+        """ Returns where the cached image is, or None when the image is not in the cache
+            The modification time is updated so the image counts as recently used """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def fetch(self, key, target):
+        """ Puts the cached image at 'target', returns False when the image is not in the cache """
+        path = self.lookup(key)
+        if path is None:
+            return False
+        place_file(path, target)
+        return True
+
+    def store(self, key, source):
+        """ Adds a rendered image to the cache, a temporary name is used
+             so other processes never see a half written image """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        place_file(source, temp_path)
+        os.replace(temp_path, path)
+
+    def store_bytes(self, key, data):
+        """ Adds an image that is in memory (the contents of a PNG file) to the cache """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temp_path, 'wb') as image:
+            image.write(data)
+        os.replace(temp_path, path)
+
+    def evict(self):
+        """ Removes the least recently used images until the cache fits in 'max_size'
+            It returns the number of images that got removed """
+        entries = list()
+        for root, _, files in os.walk(self.location):
+            for name in files:
+                if name.endswith('.png'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(entry[1] for entry in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,1017 @@
+#!/usr/bin/env python3
+
+""" This module renders the frames of an animation and encodes them into a movie
+    It is used in place of 'pypovray.render_scene_to_mp4' and takes the same arguments
+    Before anything is rendered every frame is turned into its scene description (SDL),
+     frames that have exactly the same SDL are only rendered once by POV-Ray and
+     the other frames reuse that image through a hardlink (or a copy if linking fails)
+    When a 'CacheDir' is configured, images rendered in earlier runs are reused as well
+    Include files (like the shared models) are added to every frame and their contents
+     are part of the hash, so changing a model also counts as a different scene
+    Captions that were lifted out of a scene are drawn onto the image after rendering
+    With 'RenderRanges' all frames go into one animation file (every frame with its own scene
+     file) and every POV-Ray process renders a contiguous range of frames with POV-Ray's own
+     animation loop
+    Otherwise the frames are handed to the pool longest first, using the render times
+     of earlier runs that are kept in the 'TimingsFile'
+    A checkpoint manifest next to the images remembers which frames are finished, so
+     a render that was stopped only renders the missing, corrupt or stale frames again
+    A scene that costs more than the share of one worker is split into tiles ('TileShape'),
+     the tiles are rendered in parallel and stitched together again
+    With 'Interpolate' the movie frames between two rendered frames are blended from them,
+     except across the scene cuts that the animation passes along
+    With 'DirtyRectangles' the scenes are rendered in chains, after the first scene of a chain
+     only the part of the image that changed is rendered and put onto the previous image
+    With a 'TelemetryFile' a record with the build, render and encode times of every frame
+     is written to it, see 'telemetry.py'
+    With 'StreamEncode' the frames are rendered in the order of the movie and sent to ffmpeg
+     as soon as they are done, instead of encoding the movie after the last frame
+    'ZeroDisk' streams as well but keeps the frames off the disk: the SDL (with the include files
+     in it) goes to the standard input of POV-Ray and the image comes back over its standard
+     output, only when that fails the files are written to the 'ScratchDir' (tmpfs) instead of
+     the 'OutputImageDir'
+    With 'OutputTargets' the same frames are also encoded into other movies (sizes, frame rates,
+     codecs and containers) while the main movie is encoded, see 'output_targets.py'
+    With 'BalanceTopology' the number of POV-Ray processes, their render threads and the CPUs
+     they are pinned to follow the cores and the memory of the machine, see 'topology.py'
+    With 'WarmPool' one pool is kept for the whole run and its workers also build the scenes,
+     see 'worker_pool.py'
+    A settings profile written by 'autotune.py' ('SceneProfile') gives every segment of the
+     timeline its own quality, anti-aliasing, trace level and bailout in the final render"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import re
+import copy
+import json
+import time
+import hashlib
+import tempfile
+import subprocess
+from collections import Counter, defaultdict
+from functools import partial
+from operator import itemgetter
+import numpy as np
+from PIL import Image
+from pypovray import logger, SETTINGS
+from vapory.config import POVRAY_BINARY
+from vapory.io import ppm_to_numpy
+from checkpoint import Checkpoint
+from render_cache import RenderCache, RENDER_KEYS, cache_key, place_file
+from overlay import place_captions, draw_captions, paint_captions
+from scene_export import write_animation, split_ranges
+from scheduler import RenderTimes, declared_bodies, estimate_cost, run_longest_first
+from tiles import tile_bounds, partial_options, read_tile, stitch
+from incremental import dirty_rectangle
+from lod import level_of_detail
+from interpolate import interpolated_frames
+from telemetry import Telemetry, run_measured, worker_stats, read_records
+from topology import Balancer, cpu_cores, available_memory_kb, segment_rss, thread_options
+from stream_encoder import FFMPEG_BINARY, ReorderBuffer, MovieStream, png_bytes
+from output_targets import TargetEncoders, parse_targets
+from worker_pool import WARM_POOL, open_pool
+
+
+# ------------------[Functions]------------------
+def frame_file(step):
+    """ Returns the location of the image of a frame in the 'OutputImageDir' """
+    file_name = '{}_{:04d}.png'.format(SETTINGS.OutputPrefix, step)
+    return os.path.join(SETTINGS.OutputImageDir, file_name)
+
+
+def movie_file(suffix='', container='mp4'):
+    """ Returns the location of the movie in the 'OutputMovieDir' """
+    return os.path.join(SETTINGS.OutputMovieDir, SETTINGS.OutputPrefix + suffix + '.' + container)
+
+
+def render_settings():
+    """ Returns the settings that change what a rendered image looks like """
+    return {name: getattr(SETTINGS, name) for name in RENDER_KEYS}
+
+
+def scratch_dir():
+    """ Returns the directory for the files of 'ZeroDisk' renders that can not go through a pipe,
+         the 'ScratchDir' or else /dev/shm (memory) when it exists """
+    location = getattr(SETTINGS, 'ScratchDir', None)
+    if not location:
+        location = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return location
+
+
+def font_library():
+    """ Returns the directories of the 'LibraryPath' (separated like PATH) where the fonts of
+         the caption overlay are looked for before the 'Library_Path' of POV-Ray """
+    location = getattr(SETTINGS, 'LibraryPath', None) or ''
+    return tuple(directory for directory in str(location).split(os.pathsep) if directory)
+
+
+def open_cache():
+    """ Returns the RenderCache in 'CacheDir' with a maximum size of 'CacheSize' MB,
+        or None when no 'CacheDir' is configured """
+    location = getattr(SETTINGS, 'CacheDir', None)
+    if not location:
+        return None
+    return RenderCache(location, getattr(SETTINGS, 'CacheSize', 2048))
+
+
+def zero_disk_cache():
+    """ Returns the RenderCache for 'ZeroDisk' renders, only with 'ZeroDiskCache' because the
+         'CacheDir' is often on the same network drive 'ZeroDisk' keeps the frames off """
+    if not getattr(SETTINGS, 'ZeroDiskCache', False):
+        if getattr(SETTINGS, 'CacheDir', None):
+            logger.info(" 'ZeroDisk' does not use the render cache in %s (see 'ZeroDiskCache')",
+                        SETTINGS.CacheDir)
+        return None
+    return open_cache()
+
+
+def check_zero_disk():
+    """ Stops a 'ZeroDisk' render that can not keep the frames off the disk and warns about
+         the files it still writes """
+    if getattr(SETTINGS, 'RenderRanges', False):
+        raise ValueError("'ZeroDisk' can not be used with 'RenderRanges', POV-Ray writes "
+                         "the frames of a range to files, turn one of them off")
+    if getattr(SETTINGS, 'TelemetryFile', None):
+        logger.warning(" 'ZeroDisk' still writes the telemetry of every frame to %s",
+                       SETTINGS.TelemetryFile)
+
+
+def open_telemetry():
+    """ Returns the Telemetry that writes to the 'TelemetryFile' (nothing when there is none) """
+    return Telemetry(getattr(SETTINGS, 'TelemetryFile', None))
+
+
+def open_targets(input_fps):
+    """ Returns the TargetEncoders of the 'OutputTargets' for frames at 'input_fps',
+         or None when there are no other targets than the main movie """
+    targets = parse_targets(getattr(SETTINGS, 'OutputTargets', None) or '')
+    if not targets:
+        return None
+    for target in targets:
+        target['movie'] = movie_file(target['suffix'], target['container'])
+    return TargetEncoders(targets, input_fps)
+
+
+def close_targets(targets):
+    """ Waits for the movies of the output targets to be written and logs where they are """
+    if targets is not None:
+        for movie in targets.close():
+            logger.info(" Output target written to %s", movie)
+
+
+def open_balancer(workers):
+    """ Returns the Balancer for at most 'workers' POV-Ray processes at a time, or None without
+         'BalanceTopology', the memory a segment needs comes from the 'TelemetryFile' """
+    if not getattr(SETTINGS, 'BalanceTopology', False):
+        return None
+    path = getattr(SETTINGS, 'TelemetryFile', None)
+    peaks = segment_rss(read_records(path)) if path and os.path.exists(path) else dict()
+    max_rss = getattr(SETTINGS, 'MaxWorkerRSS', 0)
+    balancer = Balancer(cpu_cores(), available_memory_kb() * getattr(SETTINGS, 'MemoryBudget', 0.8),
+                        workers, peaks, getattr(SETTINGS, 'DefaultRSS', 512) * 1024,
+                        max_rss * 1024 if max_rss else None)
+    logger.info(" Balancing at most %d POV-Ray processes over %d cores (%d CPUs) and %d MB",
+                balancer.processes, len(balancer.cores), balancer.cpu_count,
+                balancer.memory_kb // 1024)
+    return balancer
+
+
+def start_workers():
+    """ Starts the warm pool ('WarmPool') right away, after the animation loaded its models
+         and settings, so the workers get them from the main process instead of each render
+         step starting new workers """
+    if getattr(SETTINGS, 'WarmPool', False) and SETTINGS.UsePool and SETTINGS.Workers > 1:
+        WARM_POOL.start(SETTINGS.Workers)
+
+
+def open_times():
+    """ Returns the RenderTimes of earlier runs from the 'TimingsFile' """
+    path = getattr(SETTINGS, 'TimingsFile', None)
+    if not path:
+        path = os.path.join(SETTINGS.AppLocation, SETTINGS.OutputPrefix + '_timings.json')
+    return RenderTimes(path)
+
+
+def profile_file():
+    """ Returns the location of the settings profile of 'autotune.py' ('SceneProfile') """
+    path = getattr(SETTINGS, 'SceneProfile', None)
+    if not path:
+        path = os.path.join(SETTINGS.AppLocation, SETTINGS.OutputPrefix + '_profile.json')
+    return path
+
+
+def load_profile():
+    """ Returns the settings profile per segment, or None when there is no profile
+        The tuned settings that were changed since the profile was made are logged,
+         'segment_settings' keeps those as they are set now """
+    if not os.path.exists(profile_file()):
+        return None
+    with open(profile_file()) as profile:
+        profile = json.load(profile)
+    current = render_settings()
+    tuned = {name for segment in profile['segments'].values()
+             for name in segment.get('settings', {})}
+    changed = sorted(name for name in tuned if name in current and
+                     current[name] != profile.get('settings', {}).get(name))
+    if changed:
+        logger.info(" Settings profile %s is not used for %s, they were changed since it was made",
+                    profile_file(), ', '.join(changed))
+    return profile
+
+
+def segment_settings(settings, profile, segment):
+    """ Returns the render settings with the tuned settings of a segment from the profile
+        A tuned setting is only used when the setting still has the value the profile was tuned
+         from, a value given in another settings file, with '--set' or by a preview level wins """
+    if not profile or segment is None:
+        return settings
+    base = profile.get('settings', {})
+    tuned = {name: value
+             for name, value in profile['segments'].get(str(segment), {}).get('settings', {}).items()
+             if settings.get(name) == base.get(name)}
+    return dict(settings, **tuned) if tuned else settings
+
+
+def scene_sdl(scene, settings):
+    """ Turns a vapory scene into the SDL string that POV-Ray gets to see
+        The camera gets the same 'right' vector vapory gives it when rendering,
+         otherwise the aspect ratio of the image would not be correct
+        With 'LevelOfDetail' objects that are small on the image get less detail first,
+         a tuned 'MaxTraceLevel' and 'AdcBailout' go into the global settings
+        The scene itself is not changed, 'DirtyRectangles' compares the scenes as they were made """
+    scene = copy.copy(scene)
+    if getattr(SETTINGS, 'LevelOfDetail', False):
+        level_of_detail(scene, settings['ImageWidth'], settings['ImageHeight'])
+    if 'MaxTraceLevel' in settings:
+        scene.global_settings = list(scene.global_settings) + \
+            ['max_trace_level {:d}'.format(settings['MaxTraceLevel'])]
+    if 'AdcBailout' in settings:
+        scene.global_settings = list(scene.global_settings) + \
+            ['adc_bailout {:g}'.format(settings['AdcBailout'])]
+    camera = scene.camera.add_args(
+        ['right', [1.0 * settings['ImageWidth'] / settings['ImageHeight'], 0, 0]])
+    if hasattr(scene.camera, 'declared'):
+        camera.declared = scene.camera.declared
+    scene.camera = camera
+    return str(scene)
+
+
+def sdl_hash(sdl):
+    """ Returns the hash of a SDL string, frames with the same hash look exactly the same """
+    return hashlib.sha1(sdl.encode('utf-8')).hexdigest()
+
+
+def include_header(includes, inline=False):
+    """ Returns the '#include' lines for the include files and a hash of their contents,
+         with 'inline' the contents themselves are the header, so POV-Ray reads no files """
+    header, contents = '', ''
+    for path in includes:
+        with open(path) as include:
+            text = include.read()
+        contents += text
+        header += text + '\n' if inline else '#include "{}"\n'.format(os.path.abspath(path))
+    return header, sdl_hash(contents)
+
+
+def build_frame(frame, step, settings, header, profile=None, keep_scene=False):
+    """ Creates the scene of one frame and its SDL
+        It returns a dictionary with the 'step', its 'sdl', the placed 'captions', the tuned
+         'settings' of its segment (None without tuned settings) and the 'build' record,
+         with 'keep_scene' the vapory 'scene' itself is added """
+    start = time.perf_counter()
+    scene = frame(step)
+    tuned = segment_settings(settings, profile, getattr(scene, 'segment', None))
+    captions = place_captions(getattr(scene, 'captions', []), scene.camera,
+                              settings['ImageWidth'], settings['ImageHeight'], font_library())
+    sdl = header + scene_sdl(scene, tuned)
+    built = {'step': step, 'sdl': sdl, 'captions': captions,
+             'settings': tuned if tuned is not settings else None,
+             'build': {'segment': getattr(scene, 'segment', None),
+                       'objects': len(scene.objects), 'sdl_bytes': len(sdl),
+                       'build_seconds': time.perf_counter() - start}}
+    if keep_scene:
+        built['scene'] = scene
+    return built
+
+
+def build_batch(indexed_batch):
+    """ Builds a batch of frames in a pool worker with 'build_frame'
+        It returns the index of the batch together with the built frames """
+    index, (frame, steps, settings, header, profile) = indexed_batch
+    return index, [build_frame(frame, step, settings, header, profile) for step in steps]
+
+
+def built_frames(frame, frame_ids, settings, header, profile=None, keep_scenes=False):
+    """ Yields 'build_frame' for every frame in order
+        With a 'WarmPool' the workers build the frames, 'SceneBatch' frames at a time, and
+         only a few batches get ahead of the ones that were yielded, so the scenes waiting
+         for the main process do not pile up in memory
+        The vapory scenes themselves can not leave the workers, so 'keep_scenes' builds
+         the frames in this process """
+    workers = SETTINGS.Workers if SETTINGS.UsePool else 1
+    if keep_scenes or workers <= 1 or not getattr(SETTINGS, 'WarmPool', False):
+        for step in frame_ids:
+            yield build_frame(frame, step, settings, header, profile, keep_scenes)
+        return
+    size = getattr(SETTINGS, 'SceneBatch', 8)
+    batches = [(frame, frame_ids[start:start + size], settings, header, profile)
+               for start in range(0, len(frame_ids), size)]
+    buffer = ReorderBuffer(2 * workers)
+    with open_pool(workers) as pool:
+        try:
+            for index, built in pool.imap_unordered(build_batch, buffer.admit(batches)):
+                for ready in buffer.add(index, built):
+                    yield from ready
+        finally:
+            buffer.close()
+
+
+def group_frames(frame, frame_ids, settings, includes=(), profile=None, keep_scenes=False,
+                 inline=False):
+    """ This function creates the scene of every frame and groups the frames by their SDL
+            - frame: the function that creates the scene of a frame
+            - frame_ids: the frame numbers that need to be rendered
+            - settings: the render settings from 'render_settings'
+            - includes: include files that are added to the SDL of every frame
+            - profile: the settings profile from 'load_profile', None renders all frames alike
+            - keep_scenes: keeps the vapory scene of every group (for 'DirtyRectangles')
+            - inline: puts the contents of the include files in the SDL instead of '#include' 
+        Captions that 'overlay.lift_captions' took out of a scene are placed on the image here
+        It returns a dictionary with the hash of the SDL and captions as key and a dictionary
+         with the 'sdl', the placed 'captions', the 'settings' and the 'steps' that share them
+         as value, 'builds' has the segment, object count, SDL size and build time of every
+         step and with 'keep_scenes' 'vapory_scene' is the scene itself """
+    header, include_key = include_header(includes, inline)
+    groups = dict()
+    for built in built_frames(frame, frame_ids, settings, header, profile, keep_scenes):
+        tuned = built['settings'] or settings
+        key = sdl_hash(include_key + built['sdl'] + repr(built['captions']) +
+                       (repr(sorted(tuned.items())) if built['settings'] else ''))
+        if key not in groups:
+            groups[key] = {'sdl': built['sdl'], 'captions': built['captions'],
+                           'steps': list(), 'builds': dict(), 'settings': tuned}
+            if keep_scenes:
+                groups[key]['vapory_scene'] = built['scene']
+        groups[key]['steps'].append(built['step'])
+        groups[key]['builds'][built['step']] = built['build']
+    return groups
+
+
+def povray_command(pov_file, out_file, settings, file_type='N'):
+    """ Returns the POV-Ray command that renders 'pov_file' to 'out_file' with the settings
+        An 'AntiAlias' of 0 (or None) turns anti-aliasing off, 'AntialiasDepth' is optional
+        With '+I-' as 'pov_file' the SDL is read from the standard input and with '-' as
+         'out_file' the image goes to the standard output ('file_type' N is PNG, P is PPM) """
+    antialias = ['+A%f' % settings['AntiAlias']] if settings['AntiAlias'] else ['-A']
+    if settings['AntiAlias'] and settings.get('AntialiasDepth'):
+        antialias.append('+R%d' % settings['AntialiasDepth'])
+    return [POVRAY_BINARY, pov_file,
+            '+W%d' % settings['ImageWidth'], '+H%d' % settings['ImageHeight'],
+            '+Q%d' % settings['Quality'], *antialias,
+            '-D', 'Output_File_Type=%s' % file_type, '+O%s' % out_file]
+
+
+def render_sdl(job):
+    """ Renders the SDL of a job to an image, a job is a dictionary with the 'sdl',
+         the 'out_file', the render 'settings' and the 'captions' to draw on top
+        The temporary '.pov' file is written next to the image and removed afterwards,
+         an old image is removed first because it can be a hardlink into the cache
+        It returns the stats of the render for the telemetry """
+    start = time.time()
+    out_file = job['out_file']
+    pov_file = os.path.splitext(out_file)[0] + '.pov'
+    if os.path.exists(out_file):
+        os.remove(out_file)
+    with open(pov_file, 'w') as pov:
+        pov.write(job['sdl'])
+    write_seconds = time.time() - start
+
+    process, povray_seconds, peak_rss = run_measured(
+        povray_command(pov_file, out_file, job['settings']) + thread_options(job),
+        cpus=job.get('cpus'), max_rss_kb=job.get('max_rss_kb'))
+    os.remove(pov_file)
+    if process.returncode:
+        raise IOError("POVRay rendering failed with the following error: " +
+                      process.stderr.decode('ascii', 'replace'))
+    if job['captions']:
+        start_captions = time.time()
+        draw_captions(out_file, job['captions'])
+        write_seconds += time.time() - start_captions
+    return dict(worker_stats(job, start), povray_seconds=povray_seconds, peak_rss_kb=peak_rss,
+                write_seconds=write_seconds)
+
+
+def render_png(job):
+    """ Renders the SDL of a job without files: the SDL is sent to POV-Ray through a pipe
+         and the image comes back as PPM through a pipe, the captions are painted onto it
+        When POV-Ray can not render through pipes the job is rendered with its files
+         in the 'scratch_dir' instead
+        It returns the image as the contents of a PNG file and the stats of the render """
+    start = time.time()
+    command = povray_command('+I-', '-', job['settings'], 'P') + thread_options(job)
+    process, povray_seconds, peak_rss = run_measured(command, job['sdl'].encode('utf-8'),
+                                                     job.get('cpus'), job.get('max_rss_kb'))
+    if process.returncode:
+        logger.warning(" Rendering frame %d through a pipe failed, using %s: %s", job['step'],
+                       scratch_dir(), process.stderr.decode('ascii', 'replace').strip())
+        return render_scratch(job)
+    start_write = time.time()
+    pixels = ppm_to_numpy(buffer=process.stdout)
+    if job['captions']:
+        pixels = paint_captions(pixels, job['captions'])
+    data = png_bytes(pixels)
+    return data, dict(worker_stats(job, start), povray_seconds=povray_seconds,
+                      peak_rss_kb=peak_rss, write_seconds=time.time() - start_write)
+
+
+def render_scratch(job):
+    """ Renders a job with its '.pov' file and image in the 'scratch_dir', like 'render_png' """
+    out_file = os.path.join(scratch_dir(), '{}_{}_{:04d}.png'.format(
+        SETTINGS.OutputPrefix, os.getpid(), job['step']))
+    stats = render_sdl(dict(job, out_file=out_file))
+    with open(out_file, 'rb') as image:
+        data = image.read()
+    os.remove(out_file)
+    return data, stats
+
+
+def render_tile(job):
+    """ Renders one tile of a frame, a job is a dictionary with the 'pov_file', the tile
+         'out_file', the render 'settings' and the 'bounds' of the tile
+        It returns the stats of the render for the telemetry """
+    start = time.time()
+    settings = job['settings']
+    command = povray_command(job['pov_file'], job['out_file'], settings)
+    command += partial_options(job['bounds'], settings['ImageWidth'], settings['ImageHeight'])
+    process, povray_seconds, peak_rss = run_measured(command + thread_options(job),
+                                                     cpus=job.get('cpus'),
+                                                     max_rss_kb=job.get('max_rss_kb'))
+    if process.returncode:
+        raise IOError("POVRay rendering failed with the following error: " +
+                      process.stderr.decode('ascii', 'replace'))
+    return dict(worker_stats(job, start), povray_seconds=povray_seconds, peak_rss_kb=peak_rss)
+
+
+class Tiler:
+    """ Splits the expensive render jobs into tiles and stitches the tiles together again,
+         for 'scheduler.run_longest_first'
+            - shape: the shape of the tiles, 'rows' or 'blocks' ('TileShape') """
+    def __init__(self, shape='rows'):
+        self.shape = shape
+
+    def split(self, job, count):
+        """ Writes the SDL of a job to its '.pov' file and returns about 'count' tile jobs,
+             every tile job gets the memory estimate and queue time of the job """
+        settings = job['settings']
+        job['bounds'] = tile_bounds(settings['ImageWidth'], settings['ImageHeight'], count,
+                                    self.shape)
+        base = os.path.splitext(job['out_file'])[0]
+        job['pov_file'] = base + '.pov'
+        with open(job['pov_file'], 'w') as pov:
+            pov.write(job['sdl'])
+        job['tile_files'] = ['{}_tile{}.png'.format(base, index)
+                             for index in range(len(job['bounds']))]
+        shared = {key: job[key] for key in ('queued', 'rss_kb') if key in job}
+        return [dict(shared, render=render_tile, step=job['step'], tile=index,
+                     tiles=len(job['bounds']), pov_file=job['pov_file'], out_file=tile_file,
+                     settings=settings, bounds=bounds)
+                for index, (tile_file, bounds) in enumerate(zip(job['tile_files'], job['bounds']))]
+
+    @staticmethod
+    def join(job, tiles):
+        """ Stitches the tiles of a job into its image and draws its captions
+            - tiles: a (tile job, stats) tuple for every tile
+            It returns the stats of the job, with the stats of every tile in 'tiles' """
+        settings = job['settings']
+        if os.path.exists(job['out_file']):
+            os.remove(job['out_file'])
+        stitch(job['tile_files'], job['bounds'], settings['ImageWidth'], settings['ImageHeight'],
+               job['out_file'])
+        for tile_file in job['tile_files'] + [job['pov_file']]:
+            os.remove(tile_file)
+        if job['captions']:
+            draw_captions(job['out_file'], job['captions'])
+        parts = [stats for _, stats in sorted(tiles, key=lambda tile: tile[0]['tile'])]
+        stats = {'start': min(part['start'] for part in parts),
+                 'end': max(part['end'] for part in parts),
+                 'povray_seconds': sum(part['povray_seconds'] for part in parts),
+                 'peak_rss_kb': max(part['peak_rss_kb'] for part in parts),
+                 'tiles': [{name: part[name] for name in ('worker', 'start', 'end')}
+                           for part in parts]}
+        if 'queue_seconds' in parts[0]:
+            stats['queue_seconds'] = min(part['queue_seconds'] for part in parts)
+        return stats
+
+
+def render_region(job, region):
+    """ Renders only the 'region' (top, bottom, left, right) of the SDL of a job
+        It returns the pixels of the region and the stats of the render for the telemetry """
+    start = time.time()
+    settings = job['settings']
+    base = os.path.splitext(job['out_file'])[0]
+    pov_file, region_file = base + '.pov', base + '_region.png'
+    with open(pov_file, 'w') as pov:
+        pov.write(job['sdl'])
+    command = povray_command(pov_file, region_file, settings)
+    command += partial_options(region, settings['ImageWidth'], settings['ImageHeight'])
+    process, povray_seconds, peak_rss = run_measured(command)
+    os.remove(pov_file)
+    if process.returncode:
+        raise IOError("POVRay rendering failed with the following error: " +
+                      process.stderr.decode('ascii', 'replace'))
+    pixels = read_tile(region_file, region, settings['ImageWidth'], settings['ImageHeight'])
+    os.remove(region_file)
+    return pixels, dict(worker_stats(job, start), povray_seconds=povray_seconds,
+                        peak_rss_kb=peak_rss)
+
+
+def render_chain(chain):
+    """ Renders a chain of jobs that follow each other, the first job is rendered whole and every
+         next job only in its 'region' (None for the whole image), the rest of its image is
+         taken from the job before it, without captions because every job has its own
+        It returns a list with the stats of every job """
+    chain_stats, pixels = list(), None
+    for job in chain:
+        region = job['region']
+        if pixels is None or region is None:
+            stats = render_sdl(dict(job, captions=[]))
+            pixels = np.asarray(Image.open(job['out_file']).convert('RGB'))
+            stats['dirty_part'] = 1.0
+        else:
+            stats = {'dirty_part': 0.0}
+            if region[0] < region[1]:
+                top, bottom, left, right = region
+                part, stats = render_region(job, region)
+                pixels = pixels.copy()
+                pixels[top:bottom, left:right] = part
+                stats['dirty_part'] = (bottom - top) * (right - left) / pixels[..., 0].size
+            if os.path.exists(job['out_file']):
+                os.remove(job['out_file'])
+            Image.fromarray(pixels).save(job['out_file'])
+        if job['captions']:
+            draw_captions(job['out_file'], job['captions'])
+        chain_stats.append(stats)
+    return chain_stats
+
+
+def fixed_camera(jobs, scenes):
+    """ Returns the jobs of the segments in which the camera stays in place, only there the
+         dirty rectangles can save work, in a segment whose camera moves every scene needs a
+         full render anyway """
+    cameras, counts = defaultdict(set), Counter()
+    for job in jobs:
+        segment = job['builds'][job['step']]['segment']
+        cameras[segment].add(str(scenes[job['step']].camera))
+        counts[segment] += 1
+    return [job for job in jobs if len(cameras[job['builds'][job['step']]['segment']]) == 1 and
+            counts[job['builds'][job['step']]['segment']] > 1]
+
+
+def render_incremental(jobs, scenes, includes, finished):
+    """ Renders the jobs in chains of at most 'DirtyChain' scenes, from one scene to the next only
+         the dirty rectangle is rendered, a chain stops where a full render is needed anyway
+            - scenes: the vapory scene of every job by its first step
+            - finished: the function that is called with every job and its stats """
+    settings = jobs[0]['settings']
+    declared = declared_bodies(includes)
+    chain_length = getattr(SETTINGS, 'DirtyChain', 16)
+    chains, previous = list(), None
+    for job in sorted(jobs, key=lambda job: job['step']):
+        scene = scenes[job['step']]
+        job['region'] = dirty_rectangle(previous, scene, settings['ImageWidth'],
+                                        settings['ImageHeight'], declared,
+                                        getattr(SETTINGS, 'DirtyMargin', 8),
+                                        getattr(SETTINGS, 'DirtyReflections', True))
+        if job['region'] is None or not chains or len(chains[-1]) >= chain_length:
+            chains.append(list())
+        chains[-1].append(job)
+        previous = scene
+
+    # The longest chains first, the same reason the frames are rendered longest first
+    chains.sort(key=len, reverse=True)
+    for chain, chain_stats in zip(chains, run_jobs(render_chain, chains)):
+        for job, stats in zip(chain, chain_stats):
+            finished(job, stats)
+
+
+def render_range(job):
+    """ Renders a contiguous range of frames of an animation file in a single POV-Ray process
+        A job is a dictionary with the 'pov_file', the 'first' and 'last' frame, the render
+         'settings' and the 'out_files' with the image name of every frame in the range
+        POV-Ray adds the frame number to the output name, the images are renamed afterwards """
+    directory = os.path.dirname(job['pov_file'])
+    prefix = '{}_range{}_'.format(SETTINGS.OutputPrefix, job['first'])
+    command = povray_command(job['pov_file'], os.path.join(directory, prefix), job['settings'])
+    command += ['+KFI%d' % job['first'], '+KFF%d' % job['last']]
+
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode:
+        raise IOError("POVRay rendering failed with the following error: " +
+                      process.stderr.decode('ascii', 'replace'))
+
+    pattern = re.compile(re.escape(prefix) + r'(\d+)\.png$')
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match and int(match.group(1)) in job['out_files']:
+            os.replace(os.path.join(directory, name), job['out_files'][int(match.group(1))])
+    return job['first'], job['last']
+
+
+def run_jobs(function, jobs):
+    """ Runs 'function' for every job, in the pool when 'UsePool' is turned on """
+    with open_pool(SETTINGS.Workers if SETTINGS.UsePool else 1) as pool:
+        if pool is None:
+            return [function(job) for job in jobs]
+        return pool.map(function, jobs, chunksize=1)
+
+
+def render_animation(jobs):
+    """ Renders the jobs from one animation file, the frames are divided into contiguous
+         ranges (at least one per worker) and every range is one POV-Ray process,
+         a range never mixes frames with different (tuned) settings """
+    if not jobs:
+        return
+    pov_file = os.path.join(SETTINGS.OutputImageDir, SETTINGS.OutputPrefix + '_animation.pov')
+    written = write_animation(pov_file, sorted((job['step'], job['sdl']) for job in jobs))
+
+    out_files = {job['step']: job['out_file'] for job in jobs}
+    for out_file in out_files.values():
+        if os.path.exists(out_file):
+            os.remove(out_file)
+    workers = SETTINGS.Workers if SETTINGS.UsePool else 1
+    by_settings = dict()
+    for job in jobs:
+        by_settings.setdefault(repr(sorted(job['settings'].items())), list()).append(job)
+    range_jobs = list()
+    for same in by_settings.values():
+        steps = [job['step'] for job in same]
+        range_jobs += [{'pov_file': pov_file, 'first': first, 'last': last,
+                        'settings': same[0]['settings'],
+                        'out_files': {step: out_files[step] for step in range(first, last + 1)}}
+                       for first, last in split_ranges(steps, workers)]
+    range_jobs.sort(key=lambda job: job['first'] - job['last'])
+    run_jobs(render_range, range_jobs)
+    for path in written:
+        os.remove(path)
+
+    for job in jobs:
+        if job['captions']:
+            draw_captions(job['out_file'], job['captions'])
+
+
+def checkpoint_file(file_name=frame_file):
+    """ Returns the location of the checkpoint manifest, next to the images it describes """
+    return os.path.join(os.path.dirname(file_name(0)),
+                        '{}_checkpoint.json'.format(SETTINGS.OutputPrefix))
+
+
+def frame_record(job, step, stats=None):
+    """ Returns the telemetry of a frame of a job, the render stats belong to the first frame
+         and the other frames refer to it with 'same_as' """
+    record = dict(job['builds'][step], event='frame', step=step, cached=bool(job.get('cached')))
+    if step != job['step']:
+        record['same_as'] = job['step']
+    elif stats:
+        record.update(stats)
+    return record
+
+
+def finish_job(job, stats=None, file_name=frame_file, cache=None, checkpoint=None, telemetry=None,
+               ready=None):
+    """ Handles a job whose image is ready: the image is stored in the cache (when it was
+         rendered), placed for the frames with the same scene and written to the checkpoint
+         and the telemetry, 'stats' are the stats of the render that 'render_sdl' returned
+        At last 'ready' is called with the frames of the job
+        The checkpoint is written in batches, 'render_frames' writes the last batch """
+    if cache is not None and not job.get('cached'):
+        cache.store(job['key'], job['out_file'])
+    for step in job['steps'][1:]:
+        place_file(job['out_file'], file_name(step))
+    checkpoint.record(job['steps'], job['scene'], job['settings'], job['out_file'])
+    checkpoint.save()
+    if telemetry is not None:
+        for step in job['steps']:
+            telemetry.record(**frame_record(job, step, stats))
+    if ready is not None:
+        ready(job['steps'])
+
+
+def render_scheduled(jobs, includes, finished, workers):
+    """ Renders the jobs longest first with the scheduler, balanced over the cores and memory
+         with 'BalanceTopology' and the expensive jobs split into tiles """
+    declared = declared_bodies(includes)
+    balancer = open_balancer(workers)
+    for job in jobs:
+        job['estimate'] = estimate_cost(job['sdl'], declared)
+        job['queued'] = time.time()
+        if balancer is not None:
+            job['rss_kb'] = balancer.estimate(job['builds'][job['step']]['segment'])
+    run_longest_first(render_sdl, jobs, balancer.processes if balancer else workers,
+                      open_times(), finished, balancer,
+                      Tiler(getattr(SETTINGS, 'TileShape', 'rows')))
+
+
+def render_frames(frame, frame_ids, includes=(), settings=None, file_name=frame_file,
+                  profile=None, ready=None):
+    """ Renders all frames in 'frame_ids' to images, every distinct scene is only rendered once
+         and scenes that are still in the render cache are not rendered at all
+            - settings: the render settings to use instead of the ones in SETTINGS
+            - file_name: the function that gives the image name of a frame
+            - profile: the tuned settings per segment, without 'settings' the 'SceneProfile'
+               is loaded (when there is one)
+            - ready: the function that is called with the frames of every image that is
+               ready, while the other frames are still rendering
+        Frames that the checkpoint says are finished, with the same SDL and settings and an
+         intact image, are kept as they are, so a render that stopped halfway can be resumed
+        It returns the number of frames that actually got rendered by POV-Ray """
+    os.makedirs(os.path.dirname(file_name(frame_ids[0])), exist_ok=True)
+    if settings is None:
+        settings, profile = render_settings(), profile or load_profile()
+    cache = open_cache()
+    checkpoint = Checkpoint(checkpoint_file(file_name))
+    groups = group_frames(frame, frame_ids, settings, includes, profile,
+                          keep_scenes=getattr(SETTINGS, 'DirtyRectangles', False))
+    finished = partial(finish_job, file_name=file_name, cache=cache, checkpoint=checkpoint,
+                       telemetry=open_telemetry(), ready=ready)
+
+    jobs, kept, cached = list(), 0, 0
+    for key, group in groups.items():
+        steps, settings = group['steps'], group['settings']
+        if all(checkpoint.is_finished(step, key, settings, file_name(step)) for step in steps):
+            kept += len(steps)
+            if ready is not None:
+                ready(steps)
+            continue
+        job = {'sdl': group['sdl'], 'step': steps[0], 'steps': steps, 'scene': key,
+               'out_file': file_name(steps[0]),
+               'settings': settings, 'captions': group['captions'], 'builds': group['builds'],
+               'key': cache_key(key, settings)}
+        # A damaged image can be a hardlink into the cache, then the cached image is damaged too
+        damaged = any(checkpoint.is_damaged(step, key, settings, file_name(step)) for step in steps)
+        if cache is not None and not damaged and cache.fetch(job['key'], job['out_file']):
+            job['cached'] = True
+            finished(job)
+            cached += 1
+        else:
+            jobs.append(job)
+    logger.info(" Rendering %d distinct scenes for %d frames (%d from the cache, %d frames kept)",
+                len(jobs), len(frame_ids), cached, kept)
+
+    workers = SETTINGS.Workers if SETTINGS.UsePool else 1
+    try:
+        if getattr(SETTINGS, 'RenderRanges', False):
+            render_animation(jobs)
+            for job in jobs:
+                finished(job)
+        else:
+            if jobs and getattr(SETTINGS, 'DirtyRectangles', False):
+                scenes = {group['steps'][0]: group['vapory_scene'] for group in groups.values()}
+                incremental = fixed_camera(jobs, scenes)
+                if incremental:
+                    render_incremental(incremental, scenes, includes, finished)
+                    steps = {job['step'] for job in incremental}
+                    jobs = [job for job in jobs if job['step'] not in steps]
+            render_scheduled(jobs, includes, finished, workers)
+    finally:
+        # The last frames since the manifest was written
+        checkpoint.save(force=True)
+
+    if cache is not None:
+        cache.evict()
+    return len(jobs)
+
+
+def fetch_cached(indexed_jobs, cache):
+    """ Fetches the images of the jobs that are in the cache while the jobs are handed out,
+         an image of a job 'in_memory' is not placed but read from the cache itself """
+    for index, job in indexed_jobs:
+        if job['in_memory']:
+            cached = cache is not None and cache.lookup(job['key'])
+            if cached:
+                job['out_file'] = cached
+            job['cached'] = bool(cached)
+        else:
+            job['cached'] = cache is not None and cache.fetch(job['key'], job['out_file'])
+        job['queued'] = time.time()
+        yield index, job
+
+
+def stream_job(indexed_job):
+    """ Renders a job of the streaming encoder (when it was not in the cache),
+         a job 'in_memory' gets its image as 'png' data instead of a file
+        It returns the index of the job together with the job """
+    index, job = indexed_job
+    if not job.get('cached') and job['in_memory']:
+        job['png'], job['stats'] = render_png(job)
+    elif not job.get('cached'):
+        job['stats'] = render_sdl(job)
+    return index, job
+
+
+def stream_frames(frame, frame_ids, includes=(), movie=None, stride=1):
+    """ Renders the frames in the order of the movie and encodes them while rendering,
+         at most 'StreamBuffer' scenes are rendered ahead of the frame the movie waits for
+        With a 'stride' only every so many frames is rendered, the movie shows the last
+         rendered frame in place of the frames in between
+        An image is removed as soon as the last frame that shows it is encoded
+         (with 'RemoveTempFiles'), the checkpoint is not used because no images are kept
+        With 'ZeroDisk' the images stay in memory and are never written to 'OutputImageDir',
+         the include files are put in the SDL and the cache is only used with 'ZeroDiskCache'
+        It returns the number of frames that actually got rendered by POV-Ray and the movie """
+    in_memory = getattr(SETTINGS, 'ZeroDisk', False)
+    if not in_memory:
+        os.makedirs(SETTINGS.OutputImageDir, exist_ok=True)
+    cache = zero_disk_cache() if in_memory else open_cache()
+    rendered_ids = frame_ids[::stride]
+    groups = group_frames(frame, rendered_ids, render_settings(), includes, load_profile(),
+                          inline=in_memory)
+    workers = SETTINGS.Workers if SETTINGS.UsePool else 1
+    buffer = ReorderBuffer(getattr(SETTINGS, 'StreamBuffer', 4 * workers))
+    balancer = open_balancer(workers)
+    if balancer is not None:
+        workers = balancer.processes
+
+    # The jobs in the order of their first frame, so the movie can follow the jobs
+    position = {step: index for index, step in enumerate(frame_ids)}
+    shows = {step: rendered_ids[index // stride] for index, step in enumerate(frame_ids)}
+    scenes = {step: key for key, group in groups.items() for step in group['steps']}
+    last = {scenes[shows[step]]: position[step] for step in frame_ids}
+    jobs = sorted(({'sdl': group['sdl'], 'step': group['steps'][0], 'scene': key,
+                    'last': last[key], 'builds': group['builds'],
+                    'out_file': frame_file(group['steps'][0]), 'settings': group['settings'],
+                    'captions': group['captions'], 'key': cache_key(key, group['settings']),
+                    'in_memory': in_memory}
+                   for key, group in groups.items()), key=lambda job: position[job['step']])
+    starts = [position[job['step']] for job in jobs] + [len(frame_ids)]
+    if balancer is not None:
+        for job in jobs:
+            job['rss_kb'] = balancer.estimate(job['builds'][job['step']]['segment'])
+    images = dict()
+
+    telemetry = open_telemetry()
+    stream = MovieStream(movie or movie_file(), SETTINGS.RenderFPS, SETTINGS.MovieFPS)
+    targets = open_targets(SETTINGS.RenderFPS)
+    rendered = 0
+    with open_pool(workers) as pool:
+        handed_out = fetch_cached(buffer.admit(jobs), cache)
+        if balancer is not None:
+            handed_out = balancer.admit(handed_out, itemgetter(1))
+        if pool is None:
+            done = map(stream_job, handed_out)
+        else:
+            done = pool.imap_unordered(stream_job, handed_out, chunksize=1)
+        try:
+            for index, job in done:
+                if balancer is not None:
+                    balancer.release(job)
+                for order, ready in buffer.add(index, (index, job)):
+                    if not ready['cached']:
+                        rendered += 1
+                        if cache is not None and in_memory:
+                            cache.store_bytes(ready['key'], ready['png'])
+                        elif cache is not None:
+                            cache.store(ready['key'], ready['out_file'])
+                    images[ready['scene']] = ready
+                    for place in range(starts[order], starts[order + 1]):
+                        step = frame_ids[place]
+                        shown = images[scenes[shows[step]]]
+                        start = time.perf_counter()
+                        data = shown.get('png')
+                        if data is None:
+                            with open(shown['out_file'], 'rb') as image:
+                                data = image.read()
+                        stream.write_png(data)
+                        if targets is not None:
+                            targets.write(data)
+                        if step == shows[step]:
+                            telemetry.record(encode_seconds=time.perf_counter() - start,
+                                             **frame_record(shown, step, shown.get('stats')))
+                        if in_memory:
+                            if place == shown['last']:
+                                # Nothing shows this image anymore, so its memory can be freed
+                                del images[shown['scene']]
+                        elif not SETTINGS.RemoveTempFiles:
+                            if step != shown['step']:
+                                place_file(shown['out_file'], frame_file(step))
+                        elif place == shown['last']:
+                            os.remove(shown['out_file'])
+        finally:
+            buffer.close()
+            if balancer is not None:
+                balancer.close()
+    if cache is not None:
+        cache.evict()
+    close_targets(targets)
+    return rendered, stream.close()
+
+
+def encode_movie(frame_ids, movie=None, image_dir=None, targets=None):
+    """ Encodes the rendered images into a mp4 movie with ffmpeg, by default to 'movie_file'
+         from the images in the 'OutputImageDir'
+        The images are rendered with 'RenderFPS' and the movie plays at 'MovieFPS'
+        The output 'targets' (from 'open_targets') get the same images while ffmpeg runs
+        Frames that do not follow each other (several scenes) are sent to ffmpeg one by one """
+    movie = movie or movie_file()
+    os.makedirs(os.path.dirname(movie), exist_ok=True)
+    image_dir = image_dir or SETTINGS.OutputImageDir
+    pattern = os.path.join(image_dir, SETTINGS.OutputPrefix + '_%04d.png')
+    if list(frame_ids) != list(range(frame_ids[0], frame_ids[0] + len(frame_ids))):
+        stream = MovieStream(movie, SETTINGS.RenderFPS, SETTINGS.MovieFPS)
+        for step in frame_ids:
+            with open(pattern % step, 'rb') as image:
+                data = image.read()
+            stream.write_png(data)
+            if targets is not None:
+                targets.write(data)
+        close_targets(targets)
+        return stream.close()
+
+    command = [FFMPEG_BINARY, '-y', '-loglevel', 'error',
+               '-framerate', str(SETTINGS.RenderFPS), '-start_number', str(frame_ids[0]),
+               '-i', pattern, '-frames:v', str(len(frame_ids)),
+               '-r', str(SETTINGS.MovieFPS), '-pix_fmt', 'yuv420p', movie]
+    process = subprocess.Popen(command)
+    if targets is not None:
+        for step in frame_ids:
+            with open(pattern % step, 'rb') as image:
+                targets.write(image.read())
+        close_targets(targets)
+    if process.wait():
+        raise subprocess.CalledProcessError(process.returncode, command)
+    return movie
+
+
+def encode_interpolated(frame_ids, cuts, movie=None, targets=None):
+    """ Encodes the rendered images into a movie at 'MovieFPS' where the movie frames between
+         two rendered frames are blended from them (not when a scene starts in between)
+            - cuts: the frame numbers where a new scene starts
+            - targets: output targets (from 'open_targets') that get the blended frames too """
+    stream = MovieStream(movie or movie_file(), SETTINGS.MovieFPS, SETTINGS.MovieFPS)
+    for pixels in interpolated_frames(frame_ids, frame_file, cuts,
+                                      SETTINGS.RenderFPS, SETTINGS.MovieFPS):
+        stream.write_pixels(pixels)
+        if targets is not None:
+            targets.write(pixels)
+    close_targets(targets)
+    return stream.close()
+
+
+def hold_frames(frame_ids, rendered):
+    """ Fills the frames that were skipped by a stride with the last rendered frame before them """
+    shown = None
+    for step in frame_ids:
+        if step in rendered:
+            shown = step
+        elif shown is not None:
+            place_file(frame_file(shown), frame_file(step))
+
+
+def remove_frames(frame_ids):
+    """ Removes the rendered images of the frames and the checkpoint that describes them """
+    for step in frame_ids:
+        if os.path.exists(frame_file(step)):
+            os.remove(frame_file(step))
+    Checkpoint(checkpoint_file()).remove()
+
+
+def render_scene_to_mp4(frame, frame_ids=None, includes=(), cuts=(), stride=1):
+    """ Renders the frames and encodes them into a movie, same as 'pypovray.render_scene_to_mp4'
+            - frame: the function that creates the scene of a frame
+            - frame_ids: the frame numbers to render, by default all frames are rendered
+            - includes: include files that every frame needs, like the shared models
+            - cuts: the frame numbers where a new scene starts, 'Interpolate' does not blend over them
+            - stride: render only every so many frames, the others repeat the frame before them """
+    if frame_ids is None:
+        frame_ids = range(int(SETTINGS.NumberFrames))
+    frame_ids = list(frame_ids)
+    rendered_ids = frame_ids[::stride]
+
+    if getattr(SETTINGS, 'ZeroDisk', False):
+        check_zero_disk()
+    streamed = getattr(SETTINGS, 'StreamEncode', False) or getattr(SETTINGS, 'ZeroDisk', False)
+    if streamed and not getattr(SETTINGS, 'RenderRanges', False):
+        if getattr(SETTINGS, 'Interpolate', False) and SETTINGS.MovieFPS > SETTINGS.RenderFPS:
+            logger.warning(" 'Interpolate' is not used for a streamed movie, the frames are shown"
+                           " twice instead (turn off 'StreamEncode' and 'ZeroDisk' to blend them)")
+        rendered, movie = stream_frames(frame, frame_ids, includes, stride=stride)
+        logger.info(" Rendered %d frames, %d were duplicates or cached",
+                    rendered, len(rendered_ids) - rendered)
+        return movie
+
+    rendered = render_frames(frame, rendered_ids, includes)
+    logger.info(" Rendered %d frames, %d were duplicates or cached",
+                rendered, len(rendered_ids) - rendered)
+    if stride > 1:
+        hold_frames(frame_ids, set(rendered_ids))
+    start = time.perf_counter()
+    if getattr(SETTINGS, 'Interpolate', False) and SETTINGS.MovieFPS > SETTINGS.RenderFPS:
+        movie = encode_interpolated(frame_ids, cuts, targets=open_targets(SETTINGS.MovieFPS))
+    else:
+        movie = encode_movie(frame_ids, targets=open_targets(SETTINGS.RenderFPS))
+    open_telemetry().record(event='encode', frames=len(frame_ids),
+                            encode_seconds=time.perf_counter() - start)
+    if SETTINGS.RemoveTempFiles:
+        remove_frames(frame_ids)
+    return movie
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+""" This module turns the scenes of many frames into one POV-Ray animation file
+    The SDL of every frame goes into its own scene file, the animation file only picks the scene
+     file of the frame in a '#switch (frame_number)' block, so POV-Ray parses nothing but the
+     scene of the frame it renders and POV-Ray can render a whole range of frames with its own
+     animation loop (+KFI / +KFF) without starting a new process for every frame
+    Frames next to each other with the same SDL share a '#range' and a scene file
+    The frames are divided into contiguous ranges, one range per POV-Ray process"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+
+
+# ------------------[Functions]------------------
+def frame_runs(frame_sdl):
+    """ Merges frames next to each other that have the same SDL.
+            - frame_sdl: a list of (step, sdl) tuples sorted on step
+        It returns a list of (first step, last step, sdl) tuples """
+    runs = list()
+    for step, sdl in frame_sdl:
+        if runs and runs[-1][1] == step - 1 and runs[-1][2] == sdl:
+            runs[-1] = (runs[-1][0], step, sdl)
+        else:
+            runs.append((step, step, sdl))
+    return runs
+
+
+def scene_file(path, first):
+    """ Returns the location of the scene file of the run of frames that starts at 'first' """
+    return '{}_{:04d}.inc'.format(os.path.splitext(path)[0], first)
+
+
+def animation_sdl(runs, path, header=''):
+    """ Creates the SDL of the animation file at 'path' for the runs of 'frame_runs',
+         'header' is placed before the '#switch' (for instance the '#include' of the shared models)
+        Frames that are not in a run get no scene and should not be rendered """
+    lines = [header, '#switch (frame_number)']
+    for first, last, _ in runs:
+        if first == last:
+            lines.append('#case ({})'.format(first))
+        else:
+            lines.append('#range ({}, {})'.format(first, last))
+        lines += ['#include "{}"'.format(os.path.abspath(scene_file(path, first))), '#break']
+    lines.append('#end')
+    return '\n'.join(lines) + '\n'
+
+
+def write_animation(path, frame_sdl, header=''):
+    """ Writes the animation file of 'frame_sdl' to 'path' and the scene files next to it
+        It returns the locations of all files that were written, the animation file first """
+    runs = frame_runs(frame_sdl)
+    written = [path]
+    for first, _, sdl in runs:
+        written.append(scene_file(path, first))
+        with open(written[-1], 'w') as scene:
+            scene.write(sdl)
+    with open(path, 'w') as pov:
+        pov.write(animation_sdl(runs, path, header))
+    return written
+
+
+def split_ranges(steps, parts):
+    """ Divides frame numbers into contiguous (first, last) ranges.
+            - steps: the frame numbers, gaps start a new range
+            - parts: the number of ranges wanted, long ranges are cut until there are
+               this many (or every range is a single frame)
+        It returns the list of ranges, longest first so they are started first """
+    ranges = list()
+    for step in sorted(steps):
+        if ranges and ranges[-1][1] == step - 1:
+            ranges[-1][1] = step
+        else:
+            ranges.append([step, step])
+
+    while len(ranges) < parts:
+        longest = max(ranges, key=lambda part: part[1] - part[0])
+        if longest[0] == longest[1]:
+            break
+        middle = (longest[0] + longest[1]) // 2
+        ranges.remove(longest)
+        ranges += [[longest[0], middle], [middle + 1, longest[1]]]
+    return sorted((tuple(part) for part in ranges), key=lambda part: part[0] - part[1])
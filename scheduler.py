@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+""" This module decides in which order the render jobs are handed to the pool
+    Every job gets a cost: the render time measured for that frame in an earlier run, or else an
+     estimate from the objects, transparency and reflections in its SDL
+    The most expensive jobs are started first and every worker takes the next job as soon as it
+     is done, so the pool does not end with one long frame while the other workers are idle
+    A job that costs more than the work of one worker (all costs divided by the workers) would
+     hold up the end of the run on its own, such jobs are split into tiles that run side by side
+    The measured times are stored in a JSON file to make the next run better"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import re
+import math
+import json
+import time
+from functools import partial
+from operator import itemgetter
+from worker_pool import open_pool
+
+
+# ------------------[CONSTANTS]------------------
+# Cost of one object of a kind, compared to a plain sphere
+OBJECT_COSTS = {'sphere {': 1.0, 'sphere_sweep {': 8.0, 'text {': 3.0,
+                'light_source {': 0.5, 'plane {': 1.0}
+TRANSPARENT_COST = 0.3  # Extra cost for every transparent texture
+REFLECTIVE_COST = 0.15  # Extra cost for every reflective finish
+
+TRANSPARENT = re.compile(r'\b(?:filter|transmit)\s+([0-9.]+)')
+REFLECTIVE = re.compile(r'\breflection\s+([0-9.]+)')
+DECLARE = re.compile(r'#declare\s+(\w+)\s*=(.*?)(?=#declare|\Z)', re.S)
+
+
+# ------------------[Functions]------------------
+def declared_bodies(includes):
+    """ Reads the '#declare' statements out of the include files (like the shared models)
+        It returns a dictionary with the name and the SDL of every declared model """
+    bodies = dict()
+    for path in includes:
+        with open(path) as include:
+            bodies.update(DECLARE.findall(include.read()))
+    return bodies
+
+
+def estimate_cost(sdl, declared=None):
+    """ Estimates how expensive a frame is to render from its SDL.
+            - sdl: the SDL of the frame
+            - declared: the declared models the SDL refers to by name
+        Models that are referred to are counted as if they were written out in the SDL """
+    text = sdl
+    for name, body in (declared or dict()).items():
+        text += body * len(re.findall(r'\b{}\b'.format(re.escape(name)), sdl))
+
+    cost = 1.0
+    for keyword, weight in OBJECT_COSTS.items():
+        cost += weight * text.count(keyword)
+    transparent = sum(1 for value in TRANSPARENT.findall(text) if float(value) > 0)
+    reflective = sum(1 for value in REFLECTIVE.findall(text) if float(value) > 0)
+    return cost * (1 + TRANSPARENT_COST * transparent + REFLECTIVE_COST * reflective)
+
+
+def settings_name(settings):
+    """ Returns the name the timings of these render settings are stored under """
+    return '{ImageWidth}x{ImageHeight}-Q{Quality}-A{AntiAlias}'.format(**settings)
+
+
+class RenderTimes:
+    """ The render time of every frame measured in earlier runs, per render setting
+            - path: the JSON file the times are stored in """
+    def __init__(self, path):
+        self.path = path
+        self.times = dict()
+        if os.path.exists(path):
+            with open(path) as times:
+                self.times = json.load(times)
+
+    def lookup(self, settings, step):
+        """ Returns the measured render time of a frame, or None when it was never measured """
+        return self.times.get(settings_name(settings), dict()).get(str(step))
+
+    def record(self, settings, step, seconds):
+        """ Remembers the render time of a frame """
+        self.times.setdefault(settings_name(settings), dict())[str(step)] = seconds
+
+    def save(self):
+        """ Writes the times to the JSON file """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'w') as times:
+            json.dump(self.times, times)
+
+
+def predict(jobs, times):
+    """ Gives every job a 'cost' in seconds, a measured time when there is one
+         and otherwise the estimate scaled with the seconds per estimated cost
+         of the jobs that were measured before """
+    measured, estimated = 0.0, 0.0
+    for job in jobs:
+        seconds = times.lookup(job['settings'], job['step'])
+        if seconds is not None:
+            measured += seconds
+            estimated += job['estimate']
+    scale = measured / estimated if estimated else 1.0
+
+    for job in jobs:
+        seconds = times.lookup(job['settings'], job['step'])
+        job['cost'] = seconds if seconds is not None else job['estimate'] * scale
+    return jobs
+
+
+def timed(function, indexed_job):
+    """ Runs a numbered job, a job with its own 'render' function (like a tile) runs that instead
+        It returns the number of the job, how long it took and what the function returned """
+    index, job = indexed_job
+    start = time.perf_counter()
+    result = job.get('render', function)(job)
+    return index, time.perf_counter() - start, result
+
+
+def drain(jobs, workers, tiler=None):
+    """ Yields the jobs in their order, a job whose 'cost' is more than the share of one worker
+         (the cost of all jobs divided by 'workers') is split with 'tiler.split' into enough
+         tiles to bring every tile down to about that share, at most one tile per worker
+        With fewer jobs than workers to begin with this splits the jobs too """
+    share = sum(job['cost'] for job in jobs) / workers if jobs else 0
+    for job in jobs:
+        if tiler is not None and workers > 1 and job['cost'] > share > 0:
+            yield from tiler.split(job, min(workers, math.ceil(job['cost'] / share)))
+        else:
+            yield job
+
+
+def numbered(jobs, sent):
+    """ Yields every job with a number, 'sent' keeps the job of every number until it is done """
+    for index, job in enumerate(jobs):
+        sent[index] = job
+        yield index, job
+
+
+def run_longest_first(function, jobs, workers, times, finished=None, balancer=None, tiler=None):
+    """ Runs 'function' for every job, the most expensive jobs first.
+            - workers: the number of pool processes, with 1 no pool is used
+            - times: the RenderTimes, the new times get recorded and saved
+            - finished: a function that is called with every job and what 'function' returned
+               for it as soon as the job is done
+            - balancer: the 'topology.Balancer' that gives out the CPUs and memory of the jobs
+            - tiler: splits the expensive jobs into tiles ('split(job, count)' returns the tile
+               jobs, each with the 'step' of its job and the number of 'tiles') and puts the
+               results of the tiles together again ('join(job, results)'), see 'drain'
+        The pool hands out one job at a time, so a worker that finishes early takes
+         the next job instead of waiting for a fixed share of the jobs
+        Every tile is a job of its own for the balancer, the time of a tiled job is the time
+         of its tiles together """
+    ordered = sorted(predict(jobs, times), key=lambda job: job['cost'], reverse=True)
+    by_step = {job['step']: job for job in ordered}
+    sent, tiles = dict(), dict()
+    handed_out = numbered(drain(ordered, workers, tiler), sent)
+    if balancer is not None:
+        handed_out = balancer.admit(handed_out, itemgetter(1))
+    results = list()
+    with open_pool(workers) as pool:
+        if pool is None:
+            running = (timed(function, item) for item in handed_out)
+        else:
+            running = pool.imap_unordered(partial(timed, function), handed_out, chunksize=1)
+        try:
+            for index, seconds, result in running:
+                job = sent.pop(index)
+                if balancer is not None:
+                    balancer.release(job)
+                if 'tile' in job:
+                    done = tiles.setdefault(job['step'], list())
+                    done.append((job, seconds, result))
+                    if len(done) < job['tiles']:
+                        continue
+                    del tiles[job['step']]
+                    job = by_step[job['step']]
+                    seconds = sum(tile_seconds for _, tile_seconds, _ in done)
+                    result = tiler.join(job, [(tile, tile_result) for tile, _, tile_result in done])
+                results.append((job['step'], seconds))
+                if finished is not None:
+                    finished(job, result)
+        finally:
+            if balancer is not None:
+                balancer.close()
+
+    for step, seconds in results:
+        times.record(by_step[step]['settings'], step, seconds)
+    times.save()
+    return results
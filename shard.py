@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+
+""" This module divides a render job over several machines through a shared directory
+    The coordinator writes a manifest with the frame ranges (chunks) of the job, workers on any
+     host that can see the directory claim a chunk with a lock file, render it and mark it done
+    While a worker renders it keeps touching its lock file, a lock file that has not been
+     touched for 'ShardTimeout' seconds belongs to a crashed worker and the chunk is taken over,
+     a worker that finds its claim taken over stops rendering that chunk
+    When all chunks are done the coordinator encodes the movie from the shared images
+
+    Usage (the job directory has to be shared between the hosts):
+        python3 shard.py plan  /shared/job    -> writes the manifest (kept when it already exists)
+        python3 shard.py work  /shared/job    -> renders chunks until there are none left
+        python3 shard.py gather /shared/job   -> waits for all chunks and encodes the movie
+        python3 shard.py local /shared/job 4  -> all of the above with 4 local worker processes"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import importlib
+import threading
+import subprocess
+from functools import partial
+from pypovray import logger, SETTINGS
+import render_pipeline as pipeline
+
+
+# ------------------[CONSTANTS]------------------
+ANIMATION = 'eindopdracht_p2_reindert_vincent'  # The module with the 'frame' function
+
+
+# ------------------[Functions]------------------
+def job_path(job_dir, *parts):
+    """ Returns a location inside the job directory """
+    return os.path.join(job_dir, *parts)
+
+
+def chunk_name(index):
+    """ Returns the name of the claim and done files of a chunk """
+    return 'chunk_{:04d}'.format(index)
+
+
+def shard_file(job_dir, step):
+    """ Returns the location of the image of a frame in the job directory """
+    return job_path(job_dir, 'images', '{}_{:04d}.png'.format(SETTINGS.OutputPrefix, step))
+
+
+def write_atomic(path, data):
+    """ Writes JSON to a temporary file first and then renames it, so nobody reads half a file """
+    temp_path = '{}.{}.{}.tmp'.format(path, socket.gethostname(), os.getpid())
+    with open(temp_path, 'w') as temp:
+        json.dump(data, temp)
+    os.replace(temp_path, path)
+
+
+def plan(job_dir, frame_ids=None, chunk_size=None, module=ANIMATION):
+    """ Writes the manifest of the job, an existing manifest is kept so a job can be resumed
+        It returns the manifest """
+    manifest_file = job_path(job_dir, 'manifest.json')
+    if os.path.exists(manifest_file):
+        with open(manifest_file) as manifest:
+            return json.load(manifest)
+
+    if frame_ids is None:
+        frame_ids = range(int(SETTINGS.NumberFrames))
+    frame_ids = list(frame_ids)
+    chunk_size = chunk_size or getattr(SETTINGS, 'ShardSize', 30)
+    for directory in ('claims', 'done', 'images'):
+        os.makedirs(job_path(job_dir, directory), exist_ok=True)
+
+    manifest = {'module': module, 'settings': pipeline.render_settings(),
+                'profile': pipeline.load_profile(), 'frames': frame_ids,
+                'chunks': [frame_ids[start:start + chunk_size]
+                           for start in range(0, len(frame_ids), chunk_size)]}
+    write_atomic(manifest_file, manifest)
+    return manifest
+
+
+def is_done(job_dir, index):
+    """ Returns True when a chunk has been rendered """
+    return os.path.exists(job_path(job_dir, 'done', chunk_name(index) + '.done'))
+
+
+def read_claim(claim):
+    """ Returns the owner and the last touch of a claim, None for a claim that is gone """
+    try:
+        with open(claim) as claim_file:
+            return json.load(claim_file), os.path.getmtime(claim)
+    except (OSError, ValueError):
+        return None
+
+
+def release_stale(job_dir, index, timeout):
+    """ Removes the claim of a chunk when its worker stopped touching it for 'timeout' seconds
+        The claim is renamed first, only one worker can win that rename
+        Between the check and the rename another worker can have freed the chunk and claimed
+         it again, so the renamed claim is checked once more and put back when it is not the
+         stale one any more """
+    claim = job_path(job_dir, 'claims', chunk_name(index) + '.claim')
+    seen = read_claim(claim)
+    if seen is None or time.time() - seen[1] < timeout:
+        return False
+    stale = '{}.stale-{}-{}'.format(claim, socket.gethostname(), os.getpid())
+    try:
+        os.rename(claim, stale)
+    except OSError:
+        return False
+    if read_claim(stale) != seen:
+        try:
+            # A link fails when the chunk has been claimed again in the meantime
+            os.link(stale, claim)
+        except OSError:
+            pass
+        os.remove(stale)
+        return False
+    os.remove(stale)
+    logger.info(" Chunk %d had a stale claim and is free again", index)
+    return True
+
+
+class ClaimLost(Exception):
+    """ Raised in a worker whose claim was taken over while it was rendering the chunk """
+
+
+def owner():
+    """ Returns who this worker is, as it is written in its claims """
+    return {'host': socket.gethostname(), 'pid': os.getpid()}
+
+
+def try_claim(job_dir, index):
+    """ Claims a chunk by creating its lock file, it returns False when another worker has it """
+    claim = job_path(job_dir, 'claims', chunk_name(index) + '.claim')
+    try:
+        handle = os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(handle, 'w') as claim_file:
+        json.dump(owner(), claim_file)
+    return True
+
+
+def release_own(claim):
+    """ Removes a claim, but only when it still belongs to this worker
+         (it could have been taken over after this worker was thought to be dead) """
+    try:
+        with open(claim) as claim_file:
+            if json.load(claim_file) == owner():
+                os.remove(claim)
+    except (OSError, ValueError):
+        pass
+
+
+def touch_own(claim):
+    """ Touches a claim when it belongs to this worker, it returns False when it does not """
+    seen = read_claim(claim)
+    if seen is None or seen[0] != owner():
+        return False
+    try:
+        os.utime(claim)
+    except OSError:
+        return False
+    return True
+
+
+def keep_alive(claim, stop, interval):
+    """ Touches the claim every 'interval' seconds until 'stop' is set
+        When the claim is gone or belongs to another worker the chunk was taken over,
+         the render is then stopped with SIGUSR1 (see 'render_chunk') """
+    while not stop.wait(interval):
+        # Another worker that checks for a stale claim renames it away for a moment
+        if not (touch_own(claim) or (not stop.wait(1) and touch_own(claim))):
+            if not stop.is_set():
+                os.kill(os.getpid(), signal.SIGUSR1)
+            return
+
+
+def claim_lost(signum, stack):
+    """ Handles the SIGUSR1 of the heartbeat in the main thread """
+    raise ClaimLost()
+
+
+def render_chunk(job_dir, index, steps, frame, includes, settings, timeout, profile=None):
+    """ Renders the frames of a claimed chunk into the job directory and marks it done,
+         with the settings profile of the manifest so every host tunes the segments alike
+        It raises ClaimLost when another worker took over the chunk, the chunk is then
+         not marked done by this worker """
+    claim = job_path(job_dir, 'claims', chunk_name(index) + '.claim')
+    stop = threading.Event()
+    previous = signal.signal(signal.SIGUSR1, claim_lost)
+    heartbeat = threading.Thread(target=keep_alive, args=(claim, stop, timeout / 5), daemon=True)
+    heartbeat.start()
+    try:
+        pipeline.render_frames(frame, steps, includes, settings, partial(shard_file, job_dir),
+                               profile)
+        stop.set()
+        write_atomic(job_path(job_dir, 'done', chunk_name(index) + '.done'),
+                     {'host': socket.gethostname(), 'steps': steps, 'time': time.time()})
+    finally:
+        stop.set()
+        heartbeat.join()
+        signal.signal(signal.SIGUSR1, previous)
+        release_own(claim)
+
+
+def work(job_dir, poll=10):
+    """ Claims and renders chunks until every chunk is done
+        When the other chunks are all claimed the worker waits, so it can take over
+         the chunk of a worker that crashed
+        It returns the number of chunks this worker rendered """
+    manifest = plan(job_dir)
+    timeout = getattr(SETTINGS, 'ShardTimeout', 300)
+    animation = importlib.import_module(manifest['module'])
+    includes = animation.prepare_render()
+
+    rendered = 0
+    while True:
+        missing = [index for index in range(len(manifest['chunks'])) if not is_done(job_dir, index)]
+        if not missing:
+            return rendered
+
+        claimed = False
+        for index in missing:
+            if try_claim(job_dir, index) or (release_stale(job_dir, index, timeout) and
+                                             try_claim(job_dir, index)):
+                if is_done(job_dir, index):
+                    # Another worker finished it between the listing and the claim
+                    release_own(job_path(job_dir, 'claims', chunk_name(index) + '.claim'))
+                    continue
+                steps = manifest['chunks'][index]
+                logger.info(" Rendering chunk %d (frames %d-%d)", index, steps[0], steps[-1])
+                try:
+                    render_chunk(job_dir, index, steps, animation.frame, includes,
+                                 manifest['settings'], timeout, manifest.get('profile'))
+                except ClaimLost:
+                    logger.warning(" Chunk %d was taken over by another worker", index)
+                    continue
+                rendered += 1
+                claimed = True
+        if not claimed:
+            time.sleep(poll)
+
+
+def gather(job_dir, poll=10):
+    """ Waits until every chunk is done, frees stale claims so a worker can take them over,
+         and encodes the movie from the images in the job directory """
+    manifest = plan(job_dir)
+    timeout = getattr(SETTINGS, 'ShardTimeout', 300)
+    while True:
+        missing = [index for index in range(len(manifest['chunks'])) if not is_done(job_dir, index)]
+        if not missing:
+            break
+        for index in missing:
+            release_stale(job_dir, index, timeout)
+        logger.info(" Waiting for %d chunks", len(missing))
+        time.sleep(poll)
+
+    movie = pipeline.encode_movie(manifest['frames'], image_dir=job_path(job_dir, 'images'))
+    logger.info(" Movie ready: %s", movie)
+    return movie
+
+
+def run_local(job_dir, workers):
+    """ Runs the whole job on this machine with several worker processes,
+         handy to test the coordinator without other hosts """
+    plan(job_dir)
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), 'work', job_dir])
+                 for _ in range(workers)]
+    for process in processes:
+        process.wait()
+    return gather(job_dir)
+
+
+def main():
+    """ Reads the command line and runs the requested part of the sharded render """
+    parser = argparse.ArgumentParser(description='Render a job over several machines')
+    parser.add_argument('command', choices=['plan', 'work', 'gather', 'local'])
+    parser.add_argument('job_dir', help='directory that all hosts share')
+    parser.add_argument('workers', nargs='?', type=int, default=2,
+                        help='number of local worker processes (only for "local")')
+    args = parser.parse_args()
+
+    if args.command == 'plan':
+        manifest = plan(args.job_dir)
+        logger.info(" Job has %d chunks", len(manifest['chunks']))
+    elif args.command == 'work':
+        logger.info(" Rendered %d chunks", work(args.job_dir))
+    elif args.command == 'gather':
+        gather(args.job_dir)
+    else:
+        run_local(args.job_dir, args.workers)
+
+
+if __name__ == "__main__":
+    main()
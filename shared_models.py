@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+""" This module writes the textures, lights and cameras of 'my_models' once to a POV-Ray include file
+    Every model becomes a '#declare' statement and the frames only refer to the model by its name,
+     so the same texture does not have to be written and parsed again in every frame
+    'declare_models' returns a namespace that can be used in place of the 'my_models' module"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+from types import SimpleNamespace
+from vapory import Texture, Pigment, Finish, Camera, LightSource, Object
+
+
+# ------------------[CONSTANTS]------------------
+# How a declared model is used again, a light source can only be placed as an object
+REFERENCES = {Texture: Texture, Pigment: Pigment, Finish: Finish,
+              Camera: Camera, LightSource: Object}
+
+
+# ------------------[Functions]------------------
+def is_declarable(value):
+    """ Returns True for the models that get written to the include file """
+    return type(value) in REFERENCES
+
+
+def declare(name, value, lines):
+    """ Adds the '#declare' of a model to 'lines' and returns the reference to it
+        The reference keeps the model in 'declared', so its camera or location can still be read """
+    lines.append('#declare {} = {}\n'.format(name, value))
+    reference = REFERENCES[type(value)](name)
+    reference.declared = value
+    return reference
+
+
+def declare_models(models, path):
+    """ This function writes the models to an include file.
+            - models: the 'my_models' module (or anything else with models as attributes)
+            - path: the location of the include file
+        Lists of models, like the lights, are declared as 'name_0', 'name_1', ...
+        It returns a namespace with the same attributes as 'models' where all declared models
+         are replaced by a reference to their name, other attributes are kept as they are """
+    lines = list()
+    shared = SimpleNamespace()
+    for name in sorted(dir(models)):
+        if name.startswith('_'):
+            continue
+        value = getattr(models, name)
+        if is_declarable(value):
+            value = declare(name, value, lines)
+        elif isinstance(value, list) and value and all(is_declarable(item) for item in value):
+            value = [declare('{}_{}'.format(name, index), item, lines)
+                     for index, item in enumerate(value)]
+        setattr(shared, name, value)
+
+    # Written under a temporary name first, other processes may be reading the include file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'w') as include:
+        include.write('\n'.join(lines))
+    os.replace(temp_path, path)
+    return shared
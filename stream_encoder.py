@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+""" This module encodes the movie while the frames are still being rendered
+    The pool finishes frames in any order, a reorder buffer holds the frames that are done
+     too early and releases them in the order of the movie to an ffmpeg process that reads
+     the images from a pipe
+    The buffer has a fixed size, when it is full no new frames are handed out until the
+     frame that the movie is waiting for is done, so only a few images are on disk at a time"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import io
+import threading
+import subprocess
+from PIL import Image
+
+
+# ------------------[CONSTANTS]------------------
+FFMPEG_BINARY = 'ffmpeg'
+
+
+# ------------------[Functions]------------------
+def png_bytes(pixels):
+    """ Returns the contents of a quickly compressed PNG file of an array of RGB pixels """
+    png = io.BytesIO()
+    Image.fromarray(pixels).save(png, 'PNG', compress_level=1)
+    return png.getvalue()
+
+
+class ReorderBuffer:
+    """ Holds the results that are done out of order and releases them in order
+            - size: the number of items that may be handed out but not released yet """
+    def __init__(self, size):
+        self.slots = threading.BoundedSemaphore(max(1, size))
+        self.closed = threading.Event()
+        self.waiting = dict()
+        self.next_index = 0
+
+    def admit(self, items):
+        """ Yields every item with its index, but waits while the buffer is full
+            The pool reads this generator in its own thread, so waiting here holds back the pool """
+        for index, item in enumerate(items):
+            while not self.slots.acquire(timeout=1):
+                if self.closed.is_set():
+                    return
+            yield index, item
+
+    def close(self):
+        """ Stops handing out items, so a pool that failed is not kept waiting for a free slot """
+        self.closed.set()
+
+    def add(self, index, result):
+        """ Adds the result of an item and yields the results that are now in order """
+        self.waiting[index] = result
+        while self.next_index in self.waiting:
+            result = self.waiting.pop(self.next_index)
+            self.next_index += 1
+            self.slots.release()
+            yield result
+
+
+class MovieStream:
+    """ An ffmpeg process that encodes the PNG images it gets through a pipe
+            - movie: the location of the movie
+            - render_fps: the frame rate the images are rendered at
+            - movie_fps: the frame rate of the movie """
+    def __init__(self, movie, render_fps, movie_fps):
+        os.makedirs(os.path.dirname(movie), exist_ok=True)
+        self.movie = movie
+        command = [FFMPEG_BINARY, '-y', '-loglevel', 'error',
+                   '-f', 'image2pipe', '-framerate', str(render_fps), '-c:v', 'png', '-i', '-',
+                   '-r', str(movie_fps), '-pix_fmt', 'yuv420p', movie]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, image_file):
+        """ Sends an image to ffmpeg """
+        with open(image_file, 'rb') as image:
+            self.write_png(image.read())
+
+    def write_png(self, data):
+        """ Sends an image that is in memory (the contents of a PNG file) to ffmpeg """
+        self.process.stdin.write(data)
+
+    def write_pixels(self, pixels):
+        """ Sends an image that is an array of RGB pixels to ffmpeg, as a quickly compressed PNG """
+        self.write_png(png_bytes(pixels))
+
+    def close(self):
+        """ Tells ffmpeg there are no more images and waits until the movie is written
+            It returns the location of the movie """
+        self.process.stdin.close()
+        error = self.process.stderr.read()
+        if self.process.wait():
+            raise IOError("ffmpeg encoding failed with the following error: " +
+                          error.decode('ascii', 'replace'))
+        return self.movie
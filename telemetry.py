@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+""" This module writes a record of every rendered frame to a JSON lines file ('TelemetryFile')
+    A record holds the segment of the frame, the number of objects, the size of the SDL, how
+     long building the scene took, how long POV-Ray ran and how much memory it used at most,
+     which worker rendered it, how long it waited in the queue and the write and encode times
+    Every record has the 'run' it belongs to, the file is appended to by every run
+    The 'summary' command reads such a file and shows the percentiles of the times per scene
+     and how busy the workers of the pool were, for the last run unless another one is asked for
+
+    Usage:
+        python3 telemetry.py summary [--run RUN | --all] [telemetry.jsonl]"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
+import numpy as np
+from pypovray import SETTINGS
+from topology import process_rss_kb
+
+
+# ------------------[CONSTANTS]------------------
+PERCENTILES = [50, 90, 99]
+TIMES = ['build_seconds', 'povray_seconds', 'queue_seconds', 'write_seconds', 'encode_seconds']
+RSS_INTERVAL = 0.2  # Seconds between two looks at the memory of a process with a limit
+# The run the records of this process belong to, pool workers are forked and share it
+RUN_ID = '{}-{}-{}'.format(socket.gethostname(), os.getpid(), int(time.time()))
+
+
+# ------------------[Functions]------------------
+def feed(pipe, data):
+    """ Writes the data to the input of a process and closes it, a process that stops
+         reading early is not an error here, its exit code tells what went wrong """
+    try:
+        pipe.write(data)
+        pipe.close()
+    except BrokenPipeError:
+        pass
+
+
+def watch_memory(process, max_rss_kb, stopped, done):
+    """ Kills the process when its RSS gets above 'max_rss_kb', 'stopped' is set when it did """
+    while not done.wait(RSS_INTERVAL):
+        if process_rss_kb(process.pid) > max_rss_kb:
+            stopped.set()
+            process.kill()
+            return
+
+
+def exit_code(status):
+    """ Returns the exit code of a wait status like 'Popen.returncode' does, the negative signal
+         number when the process was killed (os.waitstatus_to_exitcode needs Python 3.9) """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_measured(command, data=None, cpus=None, max_rss_kb=None):
+    """ Runs a command like 'subprocess.run' and measures it
+            - data: bytes for the standard input, only then the standard output is kept
+            - cpus: the CPUs the process is pinned to, None leaves it free
+            - max_rss_kb: the process is killed when its RSS gets above this (kB)
+        It returns the finished process (with the error output in 'stderr' and the output in
+         'stdout'), the seconds it ran and the peak memory use (RSS) of the process in kB """
+    start = time.perf_counter()
+    piped = data is not None
+    process = subprocess.Popen(command, stdin=subprocess.PIPE if piped else None,
+                               stdout=subprocess.PIPE if piped else subprocess.DEVNULL,
+                               stderr=subprocess.PIPE)
+    if cpus:
+        # Pinned right after the start instead of in 'preexec_fn', that is not safe in a process
+        #  with threads, POV-Ray starts its render threads later and they inherit the CPUs
+        try:
+            os.sched_setaffinity(process.pid, cpus)
+        except OSError:
+            pass
+    # The input, output and errors go through separate threads so no pipe fills up and blocks
+    threads, errors = list(), list()
+    stopped, done = threading.Event(), threading.Event()
+    if piped:
+        threads.append(threading.Thread(target=feed, args=(process.stdin, data)))
+    threads.append(threading.Thread(target=lambda: errors.append(process.stderr.read())))
+    for thread in threads:
+        thread.start()
+    if max_rss_kb:
+        watcher = threading.Thread(target=watch_memory, args=(process, max_rss_kb, stopped, done))
+        watcher.start()
+    output = process.stdout.read() if piped else None
+    for thread in threads:
+        thread.join()
+    process.stderr.close()
+    if piped:
+        process.stdout.close()
+    _, status, usage = os.wait4(process.pid, 0)
+    done.set()
+    if max_rss_kb:
+        watcher.join()
+    seconds = time.perf_counter() - start
+    process.returncode = exit_code(status)
+    stderr = errors[0]
+    if stopped.is_set():
+        stderr += 'Stopped because it used more than {} MB of memory (MaxWorkerRSS)'.format(
+            max_rss_kb // 1024).encode('ascii')
+    finished = subprocess.CompletedProcess(command, process.returncode, output, stderr)
+    return finished, seconds, usage.ru_maxrss
+
+
+def worker_stats(job, start):
+    """ Returns the stats every worker records: its process id, when it started and stopped
+         on the job and how long the job waited in the queue before that """
+    stats = {'worker': os.getpid(), 'start': start, 'end': time.time()}
+    if 'threads' in job:
+        stats['threads'] = job['threads']
+    if 'queued' in job:
+        stats['queue_seconds'] = start - job['queued']
+    return stats
+
+
+class Telemetry:
+    """ Appends the records of the frames to a JSON lines file
+            - path: the file, with None nothing is written
+            - run: the run the records belong to """
+    def __init__(self, path, run=RUN_ID):
+        self.path = path
+        self.run = run
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def record(self, **fields):
+        """ Writes one record, every record gets the time it was written and its run """
+        if not self.path:
+            return
+        fields['time'] = time.time()
+        fields['run'] = self.run
+        with open(self.path, 'a') as telemetry:
+            telemetry.write(json.dumps(fields) + '\n')
+
+
+def read_records(path):
+    """ Returns the records in a telemetry file, lines that are cut off are skipped """
+    records = list()
+    with open(path) as telemetry:
+        for line in telemetry:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def split_runs(records):
+    """ Returns the records per run in the order the runs were written,
+         records of before the runs were tagged belong to the run 'untagged' """
+    runs = dict()
+    for record in records:
+        runs.setdefault(record.get('run', 'untagged'), list()).append(record)
+    return runs
+
+
+def utilization(records):
+    """ Returns the number of workers, the time between the first start and the last end
+         and the part of that time the workers were busy rendering, a tiled frame counts
+         the time of every tile on its own worker """
+    rendered = [part for record in records for part in record.get('tiles', [record])
+                if 'start' in part]
+    if not rendered:
+        return 0, 0.0, 0.0
+    workers = len({record['worker'] for record in rendered})
+    span = max(record['end'] for record in rendered) - min(record['start'] for record in rendered)
+    busy = sum(record['end'] - record['start'] for record in rendered)
+    return workers, span, busy / (workers * span) if span else 1.0
+
+
+def summary(records):
+    """ Returns the lines of the summary: per scene the number of frames and the percentiles
+         of every time, and the use of the pool """
+    scenes = defaultdict(list)
+    for record in records:
+        if record.get('event', 'frame') == 'frame':
+            scenes[record.get('segment')].append(record)
+
+    lines = ['{:>8} {:>7} {:>16} {}'.format('segment', 'frames', 'time', ' '.join(
+        '{:>9}'.format('p{}'.format(percentile)) for percentile in PERCENTILES))]
+    for segment in sorted(scenes, key=lambda segment: (segment is None, segment)):
+        frames = scenes[segment]
+        for name in TIMES:
+            values = [record[name] for record in frames if name in record]
+            if values:
+                lines.append('{:>8} {:>7} {:>16} {}'.format(
+                    str(segment), len(frames), name.replace('_seconds', ''), ' '.join(
+                        '{:9.3f}'.format(value) for value in np.percentile(values, PERCENTILES))))
+
+    encodes = [record['encode_seconds'] for record in records if record.get('event') == 'encode']
+    if encodes:
+        lines.append('Encoding the movie took {:.1f} seconds'.format(sum(encodes)))
+    povray_hours = sum(record.get('povray_seconds', 0) for record in records) / 3600
+    workers, span, used = utilization(records)
+    lines.append('POV-Ray ran {:.2f} hours on {} workers in {:.1f} seconds, '
+                 'the pool was busy {:.0%} of the time'.format(povray_hours, workers, span, used))
+    return lines
+
+
+def main():
+    """ Reads the command line and prints the summary of a telemetry file, every run on its own """
+    parser = argparse.ArgumentParser(description='Summarize the render telemetry')
+    parser.add_argument('command', choices=['summary'])
+    parser.add_argument('path', nargs='?', help='the telemetry file, by default the TelemetryFile')
+    choice = parser.add_mutually_exclusive_group()
+    choice.add_argument('--run', help='the run to summarize, by default the last one')
+    choice.add_argument('--all', action='store_true', help='summarize every run')
+    args = parser.parse_intermixed_args()
+
+    runs = split_runs(read_records(args.path or SETTINGS.TelemetryFile))
+    if not runs:
+        print('The telemetry file has no records')
+        return 1
+    if args.run is not None and args.run not in runs:
+        parser.error('there is no run {}, the runs are: {}'.format(args.run, ', '.join(runs)))
+    if args.all:
+        chosen = list(runs)
+    else:
+        chosen = [args.run if args.run is not None else list(runs)[-1]]
+    for run in chosen:
+        print('Run {} ({} of {} runs)'.format(run, list(runs).index(run) + 1, len(runs)))
+        for line in summary(runs[run]):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
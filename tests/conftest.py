@@ -0,0 +1,6 @@
+""" The modules of the project are plain scripts in the folder above the tests """
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
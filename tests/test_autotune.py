@@ -0,0 +1,34 @@
+""" Tests for the search of 'autotune.py' """
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('pypovray')
+import autotune
+
+
+DEFAULTS = {'Quality': 9, 'AntiAlias': 0.01, 'MaxTraceLevel': 5, 'AdcBailout': 0.0039,
+            'AntialiasDepth': 3}
+
+
+def fake_render(monkeypatch, passes):
+    """ Replaces the renders, a trial meets the budget when 'passes' returns True for it """
+    monkeypatch.setattr(autotune, 'render_trial', lambda *args: 10.0)
+    monkeypatch.setattr(autotune.os, 'remove', lambda path: None)
+    monkeypatch.setattr(autotune, 'score', lambda animation, steps, settings, header:
+                        (1.0 if passes(settings) else 0.5, 1.0))
+
+
+def test_cheapest_value_that_passes(monkeypatch):
+    fake_render(monkeypatch, lambda settings: settings['Quality'] >= 6)
+    tuned = autotune.tune_segment(None, [0], {}, '', 0.98, DEFAULTS)['settings']
+    assert tuned['Quality'] == 6 and tuned['MaxTraceLevel'] == 1 and tuned['AntiAlias'] == 0
+
+
+def test_segment_that_never_meets_the_budget(monkeypatch):
+    fake_render(monkeypatch, lambda settings: settings['MaxTraceLevel'] > 8)
+    result = autotune.tune_segment(None, [0], {}, '', 0.98, DEFAULTS)
+    assert result['settings'] == DEFAULTS and result['ssim'] == 0.5
+
+    result = autotune.tune_segment(None, [0], {}, '', 0.98)
+    assert result['settings']['MaxTraceLevel'] == autotune.SEARCH[0][1][-1]
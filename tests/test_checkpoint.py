@@ -0,0 +1,62 @@
+""" Tests for the checkpoint manifests of 'checkpoint.py' """
+
+import os
+import checkpoint
+from checkpoint import Checkpoint
+
+SETTINGS = {'ImageWidth': 320, 'ImageHeight': 180, 'Quality': 9}
+
+
+def image(tmp_path, step, data=b'image'):
+    """ Writes a fake image of a frame and returns its location """
+    path = tmp_path / 'frame_{:04d}.png'.format(step)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'render_checkpoint.json')
+    first = Checkpoint(path, 'host_a')
+    first.record([0, 1], 'sdl0', SETTINGS, image(tmp_path, 0))
+    first.save(force=True)
+
+    again = Checkpoint(path, 'host_a')
+    assert again.is_finished(0, 'sdl0', SETTINGS, image(tmp_path, 0))
+    assert not again.is_finished(0, 'other', SETTINGS, image(tmp_path, 0))
+    assert not again.is_finished(0, 'sdl0', dict(SETTINGS, Quality=4), image(tmp_path, 0))
+    assert again.is_damaged(0, 'sdl0', SETTINGS, image(tmp_path, 0, b'changed'))
+
+
+def test_hosts_keep_each_others_frames(tmp_path):
+    path = str(tmp_path / 'render_checkpoint.json')
+    host_a, host_b = Checkpoint(path, 'host_a'), Checkpoint(path, 'host_b')
+    host_a.record([0], 'sdl0', SETTINGS, image(tmp_path, 0))
+    host_b.record([1], 'sdl1', SETTINGS, image(tmp_path, 1))
+    host_a.save(force=True)
+    host_b.save(force=True)
+
+    merged = Checkpoint(path, 'host_c')
+    assert merged.is_finished(0, 'sdl0', SETTINGS, image(tmp_path, 0))
+    assert merged.is_finished(1, 'sdl1', SETTINGS, image(tmp_path, 1))
+    merged.remove()
+    assert not list(tmp_path.glob('*.json'))
+    assert Checkpoint(path, 'host_c').frames == dict()
+
+
+def test_saves_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint, 'SAVE_EVERY', 3)
+    path = str(tmp_path / 'render_checkpoint.json')
+    manifest = Checkpoint(path, 'host_a')
+    for step in range(2):
+        manifest.record([step], 'sdl', SETTINGS, image(tmp_path, step))
+        manifest.save()
+    assert not os.path.exists(manifest.own_path)
+    manifest.record([2], 'sdl', SETTINGS, image(tmp_path, 2))
+    manifest.save()
+    assert len(Checkpoint(path, 'host_a').frames) == 3
+
+
+def test_unreadable_manifest(tmp_path):
+    path = tmp_path / 'render_checkpoint.json'
+    path.write_text('{half a file')
+    assert Checkpoint(str(path), 'host_a').frames == dict()
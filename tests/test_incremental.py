@@ -0,0 +1,81 @@
+""" Tests for the dirty rectangle between two scenes of 'incremental.py' """
+
+from types import SimpleNamespace
+import pytest
+from vapory import Scene, Sphere, Camera, LightSource, Texture, Pigment
+
+pytest.importorskip('pypovray')
+import shared_models
+import render_pipeline as pipeline
+from incremental import dirty_rectangle
+
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+def declared_camera(tmp_path):
+    """ Returns a camera that refers to its '#declare' like the shared models do """
+    models = SimpleNamespace(camera_test=Camera('location', [0, 0, -20], 'look_at', [0, 0, 0]))
+    return shared_models.declare_models(models, str(tmp_path / 'models.inc')).camera_test
+
+
+def sphere_scene(camera, center):
+    """ Returns a scene with a shadowless light and a sphere at 'center' """
+    return Scene(camera, objects=[LightSource([0, 0, -50], 'color', 1, 'shadowless'),
+                                  Sphere(center, 1, Texture(Pigment('color', [1, 0, 0])))])
+
+
+def test_moved_sphere(tmp_path):
+    camera = declared_camera(tmp_path)
+    region = dirty_rectangle(sphere_scene(camera, [0, 0, 0]), sphere_scene(camera, [2, 0, 0]),
+                             WIDTH, HEIGHT)
+    assert region is not None
+    top, bottom, left, right = region
+    assert 0 <= top < HEIGHT // 2 < bottom <= HEIGHT
+    assert 0 <= left < WIDTH // 2 < right <= WIDTH
+
+
+def test_nothing_changed(tmp_path):
+    camera = declared_camera(tmp_path)
+    assert dirty_rectangle(sphere_scene(camera, [0, 0, 0]), sphere_scene(camera, [0, 0, 0]),
+                           WIDTH, HEIGHT) == (0, 0, 0, 0)
+
+
+def test_other_camera_renders_everything(tmp_path):
+    other = Camera('location', [0, 0, -30], 'look_at', [0, 0, 0])
+    assert dirty_rectangle(sphere_scene(declared_camera(tmp_path), [0, 0, 0]),
+                           sphere_scene(other, [2, 0, 0]), WIDTH, HEIGHT) is None
+
+
+def test_shadows_render_everything(tmp_path):
+    camera = declared_camera(tmp_path)
+    previous, current = sphere_scene(camera, [0, 0, 0]), sphere_scene(camera, [2, 0, 0])
+    for scene in (previous, current):
+        scene.objects[0] = LightSource([0, 0, -50], 'color', 1)
+    assert dirty_rectangle(previous, current, WIDTH, HEIGHT) is None
+
+
+def test_kept_scene_after_build_frame(tmp_path):
+    """ 'build_frame' must keep the scene as it was made, with its declared camera """
+    camera = declared_camera(tmp_path)
+    settings = {'ImageWidth': WIDTH, 'ImageHeight': HEIGHT}
+    frames = {0: sphere_scene(camera, [0, 0, 0]), 1: sphere_scene(camera, [2, 0, 0])}
+    expected = dirty_rectangle(frames[0], frames[1], WIDTH, HEIGHT)
+
+    built = [pipeline.build_frame(frames.get, step, settings, '', keep_scene=True)
+             for step in (0, 1)]
+    assert built[0]['scene'].camera.args == ['camera_test']
+    assert dirty_rectangle(built[0]['scene'], built[1]['scene'], WIDTH, HEIGHT) == expected
+    assert expected is not None
+
+
+def test_only_segments_with_a_fixed_camera(tmp_path):
+    still = declared_camera(tmp_path)
+    moving = [Camera('location', [0, 0, -20 + step], 'look_at', [0, 0, 0]) for step in range(2)]
+    scenes = {0: sphere_scene(still, [0, 0, 0]), 1: sphere_scene(still, [1, 0, 0]),
+              2: sphere_scene(moving[0], [0, 0, 0]), 3: sphere_scene(moving[1], [0, 0, 0]),
+              4: sphere_scene(still, [0, 0, 0])}
+    segments = {0: 1, 1: 1, 2: 2, 3: 2, 4: 3}
+    jobs = [{'step': step, 'builds': {step: {'segment': segment}}}
+            for step, segment in segments.items()]
+    assert [job['step'] for job in pipeline.fixed_camera(jobs, scenes)] == [0, 1]
@@ -0,0 +1,35 @@
+""" Tests for the in-between movie frames of 'interpolate.py' """
+
+import numpy as np
+import pytest
+
+pytest.importorskip('PIL')
+from PIL import Image
+from interpolate import can_blend, interpolated_frames
+
+
+def write_frames(tmp_path, values):
+    """ Writes a small grey image for every frame, it returns the function with the names """
+    for step, value in values.items():
+        Image.new('RGB', (4, 2), (value,) * 3).save(str(tmp_path / '{}.png'.format(step)))
+    return lambda step: str(tmp_path / '{}.png'.format(step))
+
+
+def test_can_blend():
+    assert can_blend(4, 5, [])
+    assert not can_blend(4, 5, [5])
+    assert not can_blend(4, 7, [])
+
+
+def test_blends_between_frames(tmp_path):
+    file_name = write_frames(tmp_path, {0: 0, 1: 100})
+    frames = [pixels[0, 0, 0] for pixels in interpolated_frames([0, 1], file_name, [], 15, 30)]
+    assert frames == [0, 50, 100, 100]
+
+
+def test_no_blend_over_cuts_and_gaps(tmp_path):
+    file_name = write_frames(tmp_path, {0: 0, 1: 100, 5: 200})
+    frames = [pixels[0, 0, 0] for pixels in interpolated_frames([0, 1, 5], file_name, [1], 15, 30)]
+    assert frames == [0, 0, 100, 100, 200, 200]
+    assert all(isinstance(pixels, np.ndarray) for pixels in
+               interpolated_frames([0, 1, 5], file_name, [], 15, 30))
@@ -0,0 +1,22 @@
+""" Tests for reading the output targets of 'output_targets.py' """
+
+import pytest
+
+pytest.importorskip('PIL')
+from output_targets import parse_targets
+
+
+def test_no_targets_by_default():
+    assert parse_targets('') == list()
+
+
+def test_parse_targets():
+    targets = parse_targets('_720p 1280x720 30 libx264 mp4, _preview 320x180 10 gif gif')
+    assert [target['suffix'] for target in targets] == ['_720p', '_preview']
+    assert (targets[0]['width'], targets[0]['height']) == (1280, 720)
+    assert targets[1]['container'] == 'gif'
+
+
+def test_incomplete_target():
+    with pytest.raises(ValueError):
+        parse_targets('_720p 1280x720 libx264 mp4')
@@ -0,0 +1,35 @@
+""" Tests for the captions of 'overlay.py' """
+
+import pytest
+from vapory import Text
+
+pytest.importorskip('PIL')
+import overlay
+
+
+def test_zero_scale_keeps_position():
+    text = Text('ttf', '"timrom.ttf"', '"Nucleus"', 0, 0,
+                'translate', [6.75, 2.8, -7.6], 'scale', [2, 2, 0])
+    caption = overlay.text_caption(text)
+    assert caption.position == pytest.approx((13.5, 5.6, -7.6))
+    assert caption.size == 2
+    assert caption.font == 'timrom.ttf'
+
+
+def test_find_font_in_library(tmp_path):
+    (tmp_path / 'timrom.ttf').write_bytes(b'')
+    assert overlay.find_font('timrom.ttf', (str(tmp_path),)) == str(tmp_path / 'timrom.ttf')
+
+
+def test_missing_font_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(overlay, 'POVRAY_INI', [])
+    with pytest.raises(IOError):
+        overlay.find_font('missing_font.ttf', (str(tmp_path),))
+
+
+def test_library_path_from_povray_ini(tmp_path, monkeypatch):
+    ini = tmp_path / 'povray.ini'
+    ini.write_text('; comment\nLibrary_Path=/usr/share/povray-3.7\n'
+                   'Library_Path="/usr/share/povray-3.7/include"\n')
+    monkeypatch.setattr(overlay, 'POVRAY_INI', [str(ini)])
+    assert overlay.library_paths() == ['/usr/share/povray-3.7', '/usr/share/povray-3.7/include']
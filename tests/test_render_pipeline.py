@@ -0,0 +1,65 @@
+""" Tests for the pure parts of 'render_pipeline.py' """
+
+import os
+import pytest
+
+pytest.importorskip('pypovray')
+import render_pipeline as pipeline
+
+
+PROFILE = {'settings': {'ImageWidth': 1920, 'ImageHeight': 1080, 'Quality': 9, 'AntiAlias': 0.01},
+           'segments': {'3': {'settings': {'Quality': 6, 'MaxTraceLevel': 3}}}}
+
+
+def test_profile_tunes_unchanged_settings():
+    settings = dict(PROFILE['settings'])
+    tuned = pipeline.segment_settings(settings, PROFILE, 3)
+    assert tuned['Quality'] == 6 and tuned['MaxTraceLevel'] == 3
+    assert pipeline.segment_settings(settings, PROFILE, 4) is settings
+
+
+def test_changed_settings_win_from_profile():
+    settings = dict(PROFILE['settings'], Quality=4)
+    tuned = pipeline.segment_settings(settings, PROFILE, 3)
+    assert tuned['Quality'] == 4 and tuned['MaxTraceLevel'] == 3
+
+
+def test_inline_include_header(tmp_path):
+    include = tmp_path / 'models.inc'
+    include.write_text('#declare red_model = texture { pigment { color rgb <1, 0, 0> } }')
+    header, key = pipeline.include_header([str(include)])
+    inline, inline_key = pipeline.include_header([str(include)], inline=True)
+    assert header.startswith('#include') and '#include' not in inline
+    assert '#declare red_model' in inline and key == inline_key
+
+
+def test_tiler_split_and_join(tmp_path):
+    from PIL import Image
+    settings = {'ImageWidth': 8, 'ImageHeight': 6, 'Quality': 9, 'AntiAlias': 0.0}
+    job = {'step': 3, 'sdl': 'sphere {}', 'out_file': str(tmp_path / 'frame_0003.png'),
+           'settings': settings, 'captions': [], 'queued': 1.0}
+    tiles = pipeline.Tiler('rows').split(job, 3)
+    assert [tile['tiles'] for tile in tiles] == [3, 3, 3] and os.path.exists(job['pov_file'])
+    for tile, value in zip(tiles, (10, 20, 30)):
+        Image.new('RGB', (8, 6), (value,) * 3).save(tile['out_file'])
+
+    stats = pipeline.Tiler.join(job, [(tile, {'worker': index, 'start': 0.0, 'end': 1.0,
+                                              'povray_seconds': 1.0, 'peak_rss_kb': 100})
+                                      for index, tile in enumerate(tiles)])
+    pixels = Image.open(job['out_file'])
+    assert [pixels.getpixel((0, row))[0] for row in (0, 2, 4)] == [10, 20, 30]
+    assert stats['povray_seconds'] == 3.0 and len(stats['tiles']) == 3
+    assert sorted(os.listdir(str(tmp_path))) == ['frame_0003.png']
+
+
+def test_finished_job_calls_ready(tmp_path):
+    from checkpoint import Checkpoint
+    file_name = lambda step: str(tmp_path / 'frame_{:04d}.png'.format(step))
+    with open(file_name(4), 'wb') as image:
+        image.write(b'image')
+    job = {'step': 4, 'steps': [4, 5], 'scene': 'sdl4', 'out_file': file_name(4),
+           'settings': {'Quality': 9}, 'cached': True}
+    ready = list()
+    pipeline.finish_job(job, file_name=file_name, checkpoint=Checkpoint(str(tmp_path / 'c.json')),
+                        ready=ready.append)
+    assert ready == [[4, 5]] and os.path.exists(file_name(5))
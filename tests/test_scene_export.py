@@ -0,0 +1,35 @@
+""" Tests for the animation file and frame ranges of 'scene_export.py' """
+
+import os
+from scene_export import frame_runs, write_animation, split_ranges
+
+
+def test_frame_runs():
+    assert frame_runs([(0, 'a'), (1, 'a'), (2, 'b'), (4, 'b')]) == \
+        [(0, 1, 'a'), (2, 2, 'b'), (4, 4, 'b')]
+
+
+def test_animation_only_includes_scene_files(tmp_path):
+    path = str(tmp_path / 'render_animation.pov')
+    written = write_animation(path, [(0, 'sphere {}'), (1, 'sphere {}'), (2, 'box {}')],
+                              '#include "models.inc"\n')
+    assert written[0] == path and all(os.path.exists(name) for name in written)
+    with open(path) as pov:
+        animation = pov.read()
+    assert 'sphere' not in animation and animation.count('#include') == 3
+    assert '#range (0, 1)' in animation and '#case (2)' in animation
+    with open(written[2]) as scene:
+        assert scene.read() == 'box {}'
+
+
+def test_split_ranges_per_worker():
+    ranges = split_ranges(range(10), 3)
+    assert len(ranges) >= 3
+    assert sorted(step for first, last in ranges for step in range(first, last + 1)) == \
+        list(range(10))
+    assert ranges[0][1] - ranges[0][0] >= ranges[-1][1] - ranges[-1][0]
+
+
+def test_split_ranges_at_gaps():
+    assert sorted(split_ranges([0, 1, 2, 5, 6], 1)) == [(0, 2), (5, 6)]
+    assert sorted(split_ranges([3], 4)) == [(3, 3)]
@@ -0,0 +1,67 @@
+""" Tests for the order and the tiles of the render jobs of 'scheduler.py' """
+
+import pytest
+
+pytest.importorskip('pypovray')
+from scheduler import RenderTimes, drain, estimate_cost, run_longest_first
+
+
+SETTINGS = {'ImageWidth': 8, 'ImageHeight': 8, 'Quality': 9, 'AntiAlias': 0.0}
+
+
+class HalfTiler:
+    """ Splits a job into two tiles and adds the results of the tiles """
+    def split(self, job, count):
+        return [{'step': job['step'], 'tile': index, 'tiles': 2, 'settings': job['settings'],
+                 'value': job['value'] / 2} for index in range(2)]
+
+    @staticmethod
+    def join(job, tiles):
+        return sum(result for _, result in tiles)
+
+
+def render_value(job):
+    """ Stands in for a render, it returns the value of the job """
+    return job['value']
+
+
+def make_jobs(count, costs=None):
+    """ Returns 'count' jobs, the most expensive first like 'run_longest_first' orders them """
+    costs = costs or [float(count - step) for step in range(count)]
+    return [{'step': step, 'settings': SETTINGS, 'estimate': cost, 'cost': cost, 'value': step}
+            for step, cost in enumerate(costs)]
+
+
+def test_estimate_counts_declared_models():
+    declared = {'red_model': 'texture { finish { reflection 0.5 } }'}
+    plain = estimate_cost('sphere { <0, 0, 0>, 1 }')
+    assert estimate_cost('sphere { <0, 0, 0>, 1 texture { red_model } }', declared) > plain
+
+
+def test_drain_tiles_only_the_expensive_jobs():
+    jobs = make_jobs(6, [40.0, 12.0, 4.0, 2.0, 1.0, 1.0])
+    handed = list(drain(jobs, 3, HalfTiler()))
+    tiled = [job['step'] for job in handed if 'tile' in job]
+    assert tiled == [0, 0]
+    assert [job['step'] for job in handed if 'tile' not in job] == [1, 2, 3, 4, 5]
+
+
+def test_drain_without_expensive_jobs():
+    jobs = make_jobs(6, [1.0] * 6)
+    assert list(drain(jobs, 3, HalfTiler())) == jobs
+    assert list(drain(jobs, 1, HalfTiler())) == jobs
+
+
+def test_drain_fewer_jobs_than_workers():
+    assert all('tile' in job for job in drain(make_jobs(2, [1.0, 1.0]), 4, HalfTiler()))
+
+
+def test_longest_first_with_tiles(tmp_path):
+    times = RenderTimes(str(tmp_path / 'times.json'))
+    done = dict()
+    results = run_longest_first(render_value, make_jobs(5, [20.0, 1.0, 1.0, 1.0, 1.0]), 3, times,
+                                lambda job, result: done.update({job['step']: result}),
+                                tiler=HalfTiler())
+    assert done == {step: step for step in range(5)}
+    assert sorted(step for step, _ in results) == list(range(5))
+    assert RenderTimes(times.path).lookup(SETTINGS, 4) is not None
@@ -0,0 +1,45 @@
+""" Tests for the frame selection of the command line of the animation """
+
+import sys
+import pytest
+
+pytest.importorskip('pypovray')
+animation = pytest.importorskip('eindopdracht_p2_reindert_vincent')
+
+
+def test_nothing_selected_is_everything():
+    assert animation.select_frames() == list(range(int(animation.TOTAL_FRAMES)))
+
+
+def test_segments_and_times():
+    fps = animation.SETTINGS.RenderFPS
+    assert animation.select_frames(segments=[1]) == list(range(4 * fps, 8 * fps))
+    assert animation.select_frames(times=[(20, 21), (23, 24)]) == \
+        list(range(20 * fps, 21 * fps)) + list(range(23 * fps, 24 * fps))
+    assert animation.select_frames(scenes=[animation.SCENE_NAMES[1]]) == \
+        animation.select_frames(segments=[1])
+
+
+def test_times_are_clipped_to_the_animation():
+    assert animation.select_frames(times=[(70, 80)]) == list()
+    assert animation.select_frames(times=[(62, 80)])[-1] == animation.TOTAL_FRAMES - 1
+
+
+@pytest.mark.parametrize('arguments', [['--time', '70', '80'], ['--time', '10', '5'],
+                                       ['--stride', '0']])
+def test_command_line_rejects_empty_selections(monkeypatch, arguments):
+    monkeypatch.setattr(sys, 'argv', ['animation'] + arguments)
+    with pytest.raises(SystemExit):
+        animation.main()
+
+
+def test_models_include_is_removed_after_the_render(monkeypatch, tmp_path):
+    include = tmp_path / 'render_models.inc'
+    include.write_text('#declare red_model = texture {}')
+    monkeypatch.setattr(sys, 'argv', ['animation', '--segment', '1'])
+    monkeypatch.setattr(animation, 'prepare_render', lambda: [str(include)])
+    monkeypatch.setattr(animation.render_pipeline, 'start_workers', lambda: None)
+    monkeypatch.setattr(animation.render_pipeline, 'render_scene_to_mp4', lambda *args, **kw: None)
+    monkeypatch.setattr(animation.SETTINGS, 'RemoveTempFiles', True, raising=False)
+    animation.main()
+    assert not include.exists()
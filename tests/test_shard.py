@@ -0,0 +1,88 @@
+""" Tests for the claims of the chunks of 'shard.py' """
+
+import os
+import json
+import time
+import signal
+import pytest
+
+pytest.importorskip('pypovray')
+import shard
+
+
+OTHER = {'host': 'other_host', 'pid': 1}
+
+
+def claim_dir(tmp_path):
+    """ Makes the claims and done directories of a job and returns the job directory """
+    for directory in ('claims', 'done'):
+        (tmp_path / directory).mkdir()
+    return str(tmp_path)
+
+
+def write_claim(job_dir, index, owner, age=0):
+    """ Writes the claim of a chunk for 'owner', last touched 'age' seconds ago """
+    claim = shard.job_path(job_dir, 'claims', shard.chunk_name(index) + '.claim')
+    with open(claim, 'w') as claim_file:
+        json.dump(owner, claim_file)
+    touched = time.time() - age
+    os.utime(claim, (touched, touched))
+    return claim
+
+
+def test_stale_claim_is_released(tmp_path):
+    job_dir = claim_dir(tmp_path)
+    claim = write_claim(job_dir, 0, OTHER, age=100)
+    assert shard.release_stale(job_dir, 0, 10)
+    assert not os.path.exists(claim)
+    assert os.listdir(shard.job_path(job_dir, 'claims')) == []
+
+
+def test_fresh_claim_is_kept(tmp_path):
+    job_dir = claim_dir(tmp_path)
+    claim = write_claim(job_dir, 0, OTHER)
+    assert not shard.release_stale(job_dir, 0, 10)
+    assert shard.read_claim(claim)[0] == OTHER
+
+
+def test_claim_taken_again_is_put_back(tmp_path, monkeypatch):
+    job_dir = claim_dir(tmp_path)
+    claim = write_claim(job_dir, 0, OTHER, age=100)
+    read_claim = shard.read_claim
+
+    def claimed_in_between(path):
+        # The stale claim is seen, then another worker frees the chunk and claims it again
+        seen = read_claim(path)
+        if path == claim:
+            write_claim(job_dir, 0, shard.owner())
+        return seen
+
+    monkeypatch.setattr(shard, 'read_claim', claimed_in_between)
+    assert not shard.release_stale(job_dir, 0, 10)
+    assert read_claim(claim)[0] == shard.owner()
+    assert os.listdir(shard.job_path(job_dir, 'claims')) == [os.path.basename(claim)]
+
+
+def test_heartbeat_stops_when_claim_is_taken_over(tmp_path, monkeypatch):
+    job_dir = claim_dir(tmp_path)
+    write_claim(job_dir, 0, shard.owner())
+
+    def render_frames(*args):
+        write_claim(job_dir, 0, OTHER)
+        time.sleep(10)
+
+    monkeypatch.setattr(shard.pipeline, 'render_frames', render_frames)
+    with pytest.raises(shard.ClaimLost):
+        shard.render_chunk(job_dir, 0, [0, 1], None, (), {}, 0.05)
+    assert not shard.is_done(job_dir, 0)
+    assert shard.read_claim(shard.job_path(job_dir, 'claims', 'chunk_0000.claim'))[0] == OTHER
+    assert signal.getsignal(signal.SIGUSR1) is not shard.claim_lost
+
+
+def test_chunk_is_done_with_own_claim(tmp_path, monkeypatch):
+    job_dir = claim_dir(tmp_path)
+    claim = write_claim(job_dir, 0, shard.owner())
+    monkeypatch.setattr(shard.pipeline, 'render_frames', lambda *args: time.sleep(0.05))
+    shard.render_chunk(job_dir, 0, [0, 1], None, (), {}, 0.05)
+    assert shard.is_done(job_dir, 0)
+    assert not os.path.exists(claim)
@@ -0,0 +1,32 @@
+""" Tests for the reorder buffer of 'stream_encoder.py' """
+
+import pytest
+
+pytest.importorskip('PIL')
+from stream_encoder import ReorderBuffer
+
+
+def test_releases_in_order():
+    buffer = ReorderBuffer(4)
+    admitted = list(buffer.admit('abcd'))
+    assert admitted == [(0, 'a'), (1, 'b'), (2, 'c'), (3, 'd')]
+    assert list(buffer.add(2, 'c')) == []
+    assert list(buffer.add(1, 'b')) == []
+    assert list(buffer.add(0, 'a')) == ['a', 'b', 'c']
+    assert list(buffer.add(3, 'd')) == ['d']
+
+
+def test_full_buffer_waits_until_closed():
+    buffer = ReorderBuffer(2)
+    admitted = buffer.admit(range(5))
+    assert [next(admitted), next(admitted)] == [(0, 0), (1, 1)]
+    buffer.close()
+    assert list(admitted) == []
+
+
+def test_released_slots_admit_more():
+    buffer = ReorderBuffer(1)
+    admitted = buffer.admit('ab')
+    assert next(admitted) == (0, 'a')
+    assert list(buffer.add(0, 'a')) == ['a']
+    assert next(admitted) == (1, 'b')
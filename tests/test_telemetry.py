@@ -0,0 +1,51 @@
+""" Tests for the process measuring of 'telemetry.py' """
+
+import os
+import sys
+import signal
+import pytest
+
+pytest.importorskip('pypovray')
+from telemetry import Telemetry, exit_code, read_records, run_measured, split_runs, utilization
+
+
+def status_of(code):
+    """ Returns the wait status of a child process that exits with 'code' """
+    pid = os.fork()
+    if pid == 0:
+        os._exit(code)
+    return os.waitpid(pid, 0)[1]
+
+
+def test_exit_code():
+    assert exit_code(status_of(0)) == 0
+    assert exit_code(status_of(3)) == 3
+
+
+def test_killed_process():
+    pid = os.fork()
+    if pid == 0:
+        signal.pause()
+        os._exit(0)
+    os.kill(pid, signal.SIGKILL)
+    assert exit_code(os.waitpid(pid, 0)[1]) == -signal.SIGKILL
+
+
+def test_pinned_process():
+    cpus = {sorted(os.sched_getaffinity(0))[0]}
+    command = [sys.executable, '-c', 'import os; print(sorted(os.sched_getaffinity(0)))']
+    finished, _, _ = run_measured(command, data=b'', cpus=cpus)
+    assert finished.returncode == 0 and finished.stdout.decode().strip() == str(sorted(cpus))
+
+
+def test_records_are_split_per_run(tmp_path):
+    path = str(tmp_path / 'telemetry.jsonl')
+    with open(path, 'w') as telemetry:
+        telemetry.write('{"event": "frame", "worker": 1, "start": 0.0, "end": 1.0}\n')
+    Telemetry(path, 'a').record(event='frame', worker=1, start=100.0, end=101.0)
+    Telemetry(path, 'b').record(event='frame', worker=2, start=200.0, end=202.0)
+    Telemetry(path, 'a').record(event='frame', worker=2, start=100.0, end=101.0)
+
+    runs = split_runs(read_records(path))
+    assert list(runs) == ['untagged', 'a', 'b'] and len(runs['a']) == 2
+    assert utilization(runs['a']) == (2, 1.0, 1.0)
@@ -0,0 +1,39 @@
+""" Tests for splitting a frame into tiles with 'tiles.py' """
+
+import pytest
+
+pytest.importorskip('PIL')
+from tiles import split, tile_bounds, partial_options
+
+
+def covered(bounds, width, height):
+    """ Returns how often every pixel is covered by the tiles """
+    counts = [[0] * width for _ in range(height)]
+    for top, bottom, left, right in bounds:
+        for row in range(top, bottom):
+            for column in range(left, right):
+                counts[row][column] += 1
+    return {count for row in counts for count in row}
+
+
+def test_split():
+    assert split(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert split(3, 5) == [(0, 3)]
+
+
+@pytest.mark.parametrize('shape', ['rows', 'blocks'])
+def test_tiles_cover_the_image_once(shape):
+    bounds = tile_bounds(64, 36, 7, shape)
+    assert covered(bounds, 64, 36) == {1}
+    assert all(bottom - top >= 2 and right - left >= 2 for top, bottom, left, right in bounds)
+
+
+def test_rows_and_blocks():
+    assert tile_bounds(64, 36, 4) == [(0, 9, 0, 64), (9, 18, 0, 64), (18, 27, 0, 64),
+                                      (27, 36, 0, 64)]
+    assert len({left for _, _, left, _ in tile_bounds(64, 36, 4, 'blocks')}) > 1
+
+
+def test_partial_options():
+    assert partial_options((0, 9, 0, 64), 64, 36) == ['+ER9']
+    assert partial_options((9, 18, 32, 64), 64, 36) == ['+SR10', '+ER18', '+SC33']
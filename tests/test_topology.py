@@ -0,0 +1,63 @@
+""" Tests for sharing the cores and memory out over the POV-Ray processes with 'topology.py' """
+
+from topology import Balancer, parse_cpu_list, segment_rss, thread_options
+
+
+CORES = [(0, 4), (1, 5), (2, 6), (3, 7)]
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list('0-3,8\n') == [0, 1, 2, 3, 8]
+
+
+def test_segment_rss():
+    records = [{'segment': 1, 'peak_rss_kb': 10}, {'segment': 1, 'peak_rss_kb': 30},
+               {'segment': 2}]
+    assert segment_rss(records) == {1: 30}
+
+
+def test_segment_rss_of_the_last_run():
+    records = [{'segment': 1, 'peak_rss_kb': 90}, {'segment': 2, 'peak_rss_kb': 50},
+               {'segment': 1, 'peak_rss_kb': 20, 'run': 'b'},
+               {'segment': 1, 'peak_rss_kb': 40, 'run': 'c'},
+               {'segment': 1, 'peak_rss_kb': 10, 'run': 'c'}]
+    assert segment_rss(records) == {1: 40, 2: 50}
+
+
+def test_threads_follow_the_memory():
+    balancer = Balancer(CORES, 4096, 8)
+    assert balancer.plan(512) == 1
+    assert balancer.plan(2048) == 4
+    assert balancer.plan(8192) == 8
+
+
+def test_admit_and_release():
+    balancer = Balancer(CORES, 4096, 8, default_rss_kb=2048, max_rss_kb=3000)
+    jobs = [{'step': step} for step in range(3)]
+    admitted = balancer.admit(jobs)
+    first, second = next(admitted), next(admitted)
+    assert first['threads'] == 4 and first['max_rss_kb'] == 3000
+    assert set(first['cpus']).isdisjoint(second['cpus'])
+    # Whole cores go to a job with several threads
+    assert sorted(first['cpus']) in ([0, 1, 4, 5], [2, 3, 6, 7])
+    assert thread_options(first) == ['+WT4']
+    assert not balancer.fits(4, 2048)
+
+    balancer.release(first)
+    assert next(admitted)['threads'] == 4
+    balancer.release(second)
+    assert balancer.running == 1
+
+
+def test_cached_jobs_pass():
+    balancer = Balancer(CORES, 1024, 1)
+    jobs = [{'step': 0}, {'step': 1, 'cached': True}]
+    admitted = balancer.admit(jobs)
+    next(admitted)
+    assert next(admitted) == {'step': 1, 'cached': True}
+
+
+def test_a_big_job_runs_alone():
+    balancer = Balancer(CORES, 1024, 8)
+    assert next(balancer.admit([{'step': 0, 'rss_kb': 4096}]))['rss_kb'] == 4096
+    assert balancer.running == 1
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+""" This module splits a single frame into tiles that can be rendered by several POV-Ray processes
+    POV-Ray can render a part of the image with its start and end row and column options,
+     every tile is rendered as such a partial render and the tiles are stitched back together
+    This keeps all workers busy when there are fewer frames than workers, for instance when
+     only a short range of the animation or a single still is rendered"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import math
+import numpy as np
+from PIL import Image
+
+
+# ------------------[Functions]------------------
+def split(size, parts):
+    """ Divides 'size' pixels into 'parts' stretches that differ at most one pixel in size
+        It returns a list of (start, end) tuples, the end is not part of the stretch """
+    parts = max(1, min(parts, size // 2))
+    edges = [size * part // parts for part in range(parts + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def tile_bounds(width, height, count, shape='rows'):
+    """ Returns the bounds of 'count' tiles of an image as (top, bottom, left, right) tuples
+            - shape: 'rows' gives horizontal bands, 'blocks' a grid of about square blocks
+        Every tile is at least two pixels high and wide, so there can be fewer tiles """
+    if shape == 'blocks':
+        columns = max(1, round(math.sqrt(count * width / height)))
+        rows = max(1, math.ceil(count / columns))
+    else:
+        columns, rows = 1, count
+    return [(top, bottom, left, right)
+            for top, bottom in split(height, rows)
+            for left, right in split(width, columns)]
+
+
+def partial_options(bounds, width, height):
+    """ Returns the POV-Ray options that render only the tile, POV-Ray counts from 1
+        A start of the first row or column is left out, '+SR1' would be read as 100% """
+    top, bottom, left, right = bounds
+    options = list()
+    if top > 0:
+        options.append('+SR%d' % (top + 1))
+    if bottom < height:
+        options.append('+ER%d' % bottom)
+    if left > 0:
+        options.append('+SC%d' % (left + 1))
+    if right < width:
+        options.append('+EC%d' % right)
+    return options
+
+
+def read_tile(tile_file, bounds, width, height):
+    """ Reads the pixels of a tile, POV-Ray either writes just the tile
+         or an image of the full size where only the tile is rendered """
+    top, bottom, left, right = bounds
+    pixels = np.asarray(Image.open(tile_file).convert('RGB'))
+    if pixels.shape[:2] == (height, width):
+        return pixels[top:bottom, left:right]
+    if pixels.shape[:2] == (bottom - top, width):
+        return pixels[:, left:right]
+    return pixels[:bottom - top, :right - left]
+
+
+def stitch(tile_files, bounds, width, height, out_file):
+    """ Puts the rendered tiles together into the image of the whole frame """
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    for tile_file, (top, bottom, left, right) in zip(tile_files, bounds):
+        image[top:bottom, left:right] = read_tile(tile_file, (top, bottom, left, right),
+                                                  width, height)
+    Image.fromarray(image).save(out_file)
+    return out_file
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+""" This module contains the Timeline that divides an animation into its scenes (segments)
+    It is built once from the end times of the scenes and then maps a frame number
+     to the scene it belongs to and how far that scene has progressed
+    A Timeline only holds tuples of numbers, so it can be pickled and sent to pool workers"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+from bisect import bisect_right
+
+
+class Timeline:
+    """ The scenes of an animation as intervals of frames
+            - ends: a list with the end time of every scene (in seconds)
+            - fps: the amount of frames that get rendered per second """
+    def __init__(self, ends, fps):
+        self.fps = fps
+        self.ends = tuple(ends)
+        self.starts = (0,) + self.ends[:-1]
+        self.durations = tuple(end - start for start, end in zip(self.starts, self.ends))
+        self.frame_starts = tuple(int(round(start * fps)) for start in self.starts)
+        self.frame_ends = tuple(int(round(end * fps)) for end in self.ends)
+
+    def __len__(self):
+        return len(self.ends)
+
+    def segment(self, step):
+        """ Returns the number of the scene a frame belongs to,
+             frames after the last scene get len(timeline) """
+        return bisect_right(self.frame_ends, step)
+
+    def progress(self, segment, step):
+        """ Returns how far a scene has progressed at a frame, 1 / frames at the first frame
+             of the scene and 1 at the last one, before the scene starts it is 0 or lower """
+        used_frames = self.fps * self.durations[segment]
+        curr_frame = (step + 1) - self.fps * self.starts[segment]
+        return curr_frame / used_frames
+
+    def locate(self, step):
+        """ Returns a tuple of the scene a frame belongs to and the progress in that scene """
+        segment = self.segment(step)
+        if segment == len(self):
+            return segment, 1.0
+        return segment, self.progress(segment, step)
+
+    def frames(self, segment):
+        """ Returns the range of frame numbers that belong to a scene """
+        return range(self.frame_starts[segment], self.frame_ends[segment])
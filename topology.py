@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+""" This module balances the POV-Ray processes against the cores and the memory of the machine
+    The topology is read from Linux: the CPUs this process may use (its affinity), which of
+     them are hyperthreads of the same core (sysfs) and how much memory is available (meminfo)
+    A job only starts when there are free cores and enough memory for it, the memory a job
+     needs is the highest peak RSS its segment had in the telemetry of earlier runs
+    A job that needs a lot of memory leaves room for fewer jobs next to it, so it gets more
+     render threads (+WT) instead: cheap text scenes run many at a time with one thread each,
+     heavy mRNA scenes run fewer at a time and share the cores out among them
+    Every job is pinned to its own CPUs, the hyperthreads of a core stay together
+    A POV-Ray process that uses more memory than 'MaxWorkerRSS' is stopped"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import os
+import threading
+from collections import defaultdict
+
+
+# ------------------[CONSTANTS]------------------
+SIBLINGS = '/sys/devices/system/cpu/cpu{}/topology/thread_siblings_list'
+MEMINFO = '/proc/meminfo'
+
+
+# ------------------[Functions]------------------
+def parse_cpu_list(text):
+    """ Returns the CPU numbers of a Linux CPU list like '0-3,8' """
+    cpus = list()
+    for part in text.strip().split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            cpus += range(int(first), int(last) + 1)
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def cpu_cores():
+    """ Returns the cores this process may run on, every core as a tuple of its CPUs
+         (hyperthreads), a CPU without topology information counts as a core of its own """
+    usable = sorted(os.sched_getaffinity(0))
+    cores = list()
+    for cpu in usable:
+        try:
+            with open(SIBLINGS.format(cpu)) as siblings:
+                core = tuple(sibling for sibling in parse_cpu_list(siblings.read())
+                             if sibling in usable)
+        except (OSError, ValueError):
+            core = (cpu,)
+        if core not in cores:
+            cores.append(core)
+    return cores
+
+
+def available_memory_kb():
+    """ Returns the memory that is available for new processes in kB """
+    try:
+        with open(MEMINFO) as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def segment_rss(records):
+    """ Returns the highest peak RSS (kB) of the frames of every segment in telemetry records,
+         from the last run that rendered the segment (the settings can differ between runs) """
+    peaks, last_run = defaultdict(dict), dict()
+    for record in records:
+        if 'peak_rss_kb' in record:
+            segment, run = record.get('segment'), record.get('run')
+            peaks[segment][run] = max(peaks[segment].get(run, 0), record['peak_rss_kb'])
+            last_run[segment] = run
+    return {segment: peaks[segment][run] for segment, run in last_run.items()}
+
+
+def process_rss_kb(pid):
+    """ Returns the current RSS of a process in kB, 0 when it is gone """
+    try:
+        with open('/proc/{}/status'.format(pid)) as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def thread_options(job):
+    """ Returns the POV-Ray options for the number of render threads the balancer gave a job """
+    return ['+WT%d' % job['threads']] if 'threads' in job else []
+
+
+class Balancer:
+    """ Hands out cores and memory to the render jobs
+            - cores: the cores from 'cpu_cores'
+            - memory_kb: the memory all POV-Ray processes together may use
+            - processes: the most jobs that may run at the same time (the pool size)
+            - peaks: the peak RSS per segment from 'segment_rss'
+            - default_rss_kb: the memory a job of a segment without a known peak needs
+            - max_rss_kb: the RSS a POV-Ray process is stopped at, None for no limit """
+    def __init__(self, cores, memory_kb, processes, peaks=None, default_rss_kb=512 * 1024,
+                 max_rss_kb=None):
+        self.cores = cores
+        self.cpu_count = sum(len(core) for core in cores)
+        self.memory_kb = memory_kb
+        self.processes = max(1, min(processes, self.cpu_count))
+        self.peaks = peaks or dict()
+        self.default_rss_kb = default_rss_kb
+        self.max_rss_kb = max_rss_kb
+        self.free = [cpu for core in cores for cpu in core]
+        self.used_kb = 0
+        self.running = 0
+        self.changed = threading.Condition()
+        self.closed = False
+
+    def estimate(self, segment):
+        """ Returns the memory (kB) a job of a segment is expected to need """
+        return self.peaks.get(segment, self.default_rss_kb)
+
+    def plan(self, rss_kb):
+        """ Returns how many CPUs a job with this memory need gets: the CPUs shared out over
+             the jobs that fit in the memory next to each other """
+        side_by_side = max(1, min(self.processes, self.memory_kb // max(rss_kb, 1)))
+        return max(1, self.cpu_count // side_by_side)
+
+    def take(self, count):
+        """ Takes 'count' free CPUs, always from the core with the most free CPUs, so a job
+             with several threads gets whole cores and jobs with one thread spread out over
+             the cores before two of them share one """
+        taken = list()
+        while len(taken) < count and self.free:
+            core = max(self.cores, key=lambda core: sum(cpu in self.free for cpu in core))
+            cpus = [cpu for cpu in core if cpu in self.free][:count - len(taken)]
+            taken += cpus
+            self.free = [cpu for cpu in self.free if cpu not in cpus]
+        return taken
+
+    def fits(self, cpus, rss_kb):
+        """ Returns True when a job fits in the free CPUs and memory, a job always fits
+             when nothing is running, so a job that is too big still runs on its own """
+        if self.running == 0:
+            return True
+        return self.running < self.processes and len(self.free) >= cpus and \
+            self.used_kb + rss_kb <= self.memory_kb
+
+    def admit(self, items, job=lambda item: item):
+        """ Yields the items once their job has its CPUs ('cpus', 'threads') and memory,
+             jobs that are 'cached' pass straight away
+            - job: gives the job dictionary of an item
+            The pool reads this generator in its own thread, so waiting here holds back the pool """
+        for item in items:
+            current = job(item)
+            if current.get('cached'):
+                yield item
+                continue
+            rss_kb = current.get('rss_kb', self.default_rss_kb)
+            cpus = min(self.plan(rss_kb), self.cpu_count)
+            with self.changed:
+                while not self.fits(cpus, rss_kb):
+                    self.changed.wait(timeout=1)
+                    if self.closed:
+                        return
+                taken = self.take(cpus)
+                self.used_kb += rss_kb
+                self.running += 1
+            current.update(cpus=taken, threads=len(taken), rss_kb=rss_kb)
+            if self.max_rss_kb:
+                current['max_rss_kb'] = self.max_rss_kb
+            yield item
+
+    def release(self, job):
+        """ Gives the CPUs and memory of a finished job back """
+        if 'cpus' not in job:
+            return
+        with self.changed:
+            self.free += list(job['cpus'])
+            self.used_kb -= job['rss_kb']
+            self.running -= 1
+            self.changed.notify_all()
+
+    def close(self):
+        """ Stops handing out jobs, so a pool that failed is not kept waiting """
+        with self.changed:
+            self.closed = True
+            self.changed.notify_all()
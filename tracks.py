@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+""" This module contains Tracks, values that move between keyframes during the animation
+    A Track is evaluated for all frames at once with NumPy instead of frame by frame,
+     the result is an array with a row for every frame that the scenes only have to index
+    Between two keyframes the value follows an easing curve, 'linear' gives the same
+     movement as the old 'get_added_distance' did"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import numpy as np
+
+
+# -------------------[Easing]--------------------
+# Easing curves map the progress between two keyframes (0 to 1) onto a new progress
+def linear(progress):
+    """ Moves at the same speed the whole time """
+    return progress
+
+
+def ease_in(progress):
+    """ Starts slow and speeds up """
+    return progress * progress
+
+
+def ease_out(progress):
+    """ Starts fast and slows down """
+    return progress * (2 - progress)
+
+
+def ease_in_out(progress):
+    """ Starts slow, speeds up in the middle and slows down at the end """
+    return progress * progress * (3 - 2 * progress)
+
+
+# -------------------[Tracks]--------------------
+class Track:
+    """ A value that moves between keyframes
+            - keyframes: a list of (frame, value) tuples, the value is a number or a list [x, y, z]
+            - easing: the easing curve used between every two keyframes
+        Before the first and after the last keyframe the value stays the same """
+    def __init__(self, keyframes, easing=linear):
+        keyframes = sorted(keyframes, key=lambda keyframe: keyframe[0])
+        self.frames = np.array([keyframe[0] for keyframe in keyframes], dtype=float)
+        self.values = np.array([np.atleast_1d(keyframe[1]) for keyframe in keyframes],
+                               dtype=float)
+        self.easing = easing
+
+    def evaluate(self, steps):
+        """ Returns an array with the value of the track at every frame in 'steps',
+             the array has a row per frame and a column per axis """
+        steps = np.asarray(steps, dtype=float)
+        if len(self.frames) == 1:
+            return np.repeat(self.values, len(steps), axis=0)
+
+        index = np.searchsorted(self.frames, steps, side='right') - 1
+        index = np.clip(index, 0, len(self.frames) - 2)
+        start, end = self.frames[index], self.frames[index + 1]
+        progress = self.easing(np.clip((steps - start) / (end - start), 0, 1))
+        change = self.values[index + 1] - self.values[index]
+        return self.values[index] + change * progress[:, np.newaxis]
+
+
+def movement(timeline, segment, distance, easing=linear):
+    """ Creates the Track of a movement over the 'distance' during one scene of the timeline
+            - timeline: the Timeline of the animation
+            - segment: the number of the scene the movement takes
+            - distance: the distance of the movement, a number or a list [x, y, z]
+        The value is 0 up to the frame before the scene and reaches 'distance'
+         at the last frame of the scene, just like 'get_added_distance' """
+    zero = np.zeros_like(np.atleast_1d(distance), dtype=float)
+    return Track([(timeline.frame_starts[segment] - 1, zero),
+                  (timeline.frame_ends[segment] - 1, distance)], easing)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+""" This module keeps one pool of worker processes for the whole run (a warm pool)
+    Without it every render step starts a new pool, every worker then has to be forked again,
+     and the preview, shard and tile steps each pay for that on every chunk
+    The warm pool is forked once, after the animation has loaded its models, the TIMELINE and
+     the movements, so the workers share those with the main process (copy-on-write) and
+     every job that comes later can start right away
+    The workers see the modules as they were when the pool was started, so it should be
+     started when the settings and models are ready (see 'render_pipeline.start_workers')
+    With 'WarmPool' turned off a new pool is made for every step, like before"""
+
+__author__ = "Reindert Visser and Vincent Talen"
+__version__ = "2.0"
+
+import atexit
+import multiprocessing
+from contextlib import contextmanager, nullcontext
+from pypovray import logger, SETTINGS
+
+
+# ------------------[Functions]------------------
+class WarmPool:
+    """ A pool of forked workers that is kept between the render steps """
+    def __init__(self):
+        self.pool = None
+        self.workers = 0
+
+    def start(self, workers):
+        """ Forks the workers, a running pool with enough workers is kept """
+        if self.pool is not None and self.workers >= workers:
+            return self.pool
+        self.close()
+        self.pool = multiprocessing.get_context('fork').Pool(workers)
+        self.workers = workers
+        logger.info(" Started a warm pool of %d workers", workers)
+        return self.pool
+
+    @contextmanager
+    def borrow(self, workers):
+        """ Lends out the pool for one step, after an error the pool is stopped because
+             it can still be busy with the jobs of the step that failed """
+        pool = self.start(workers)
+        try:
+            yield pool
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """ Stops the workers """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+        self.pool, self.workers = None, 0
+
+
+WARM_POOL = WarmPool()
+atexit.register(WARM_POOL.close)
+
+
+def open_pool(workers):
+    """ Returns a context with the pool for a render step: the warm pool with 'WarmPool',
+         otherwise a new pool that is stopped after the step, None for a single worker """
+    if workers <= 1:
+        return nullcontext()
+    if getattr(SETTINGS, 'WarmPool', False):
+        return WARM_POOL.borrow(workers)
+    return multiprocessing.Pool(workers)